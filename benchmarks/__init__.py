@@ -0,0 +1,19 @@
+""":mod:`benchmarks` --- performance suite for dodotable
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Measures the hot paths of :class:`dodotable.schema.Table` (``select``,
+``count``, ``__html__``, :attr:`~dodotable.schema.Pager.pages`,
+:class:`~dodotable.condition.IlikeSet` filtering and exporting) against
+SQLite fixtures of several sizes.
+
+.. code-block:: console
+
+   $ python -m benchmarks run --rows 1000 --columns 5 -o before.json
+   $ git checkout feature-branch
+   $ python -m benchmarks run --rows 1000 --columns 5 -o after.json
+   $ python -m benchmarks compare before.json after.json
+
+Fixture databases are cached in ``--data-dir`` so that the large ones
+(1M rows) are built only once.
+
+"""
@@ -0,0 +1,161 @@
+""":mod:`benchmarks.__main__` --- command line interface
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import sqlalchemy
+
+from dodotable import __version__
+from dodotable.schema import Schema
+
+from .cases import CASES, BenchmarkEnvironment, Fixture
+from .fixtures import build_fixture, open_session
+
+
+DEFAULT_ROWS = 1000, 100000, 1000000
+
+DEFAULT_COLUMNS = 5, 20, 60
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        function()
+        timings.append(timeit.default_timer() - start)
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'min': timings[0],
+        'median': timings[len(timings) // 2],
+        'mean': sum(timings) / len(timings),
+        'max': timings[-1],
+    }
+
+
+def run(args):
+    Schema.environment = BenchmarkEnvironment()
+    if not os.path.isdir(args.data_dir):
+        os.makedirs(args.data_dir)
+    cases = args.case or list(CASES)
+    results = []
+    for rows in args.rows:
+        for columns in args.columns:
+            engine, model = build_fixture(args.data_dir, rows, columns)
+            try:
+                for name in cases:
+                    session = open_session(engine)
+                    try:
+                        fixture = Fixture(engine=engine, model=model,
+                                          session=session, rows=rows,
+                                          columns=columns)
+                        function = CASES[name](fixture)
+                        # Warm up caches (templates, compiled statements).
+                        function()
+                        result = measure(function, args.repeat)
+                    finally:
+                        session.close()
+                    result.update(case=name, rows=rows, columns=columns)
+                    results.append(result)
+                    print('{case:>24} rows={rows:<8} columns={columns:<3} '
+                          'median={median:.6f}s'.format(**result),
+                          file=sys.stderr)
+            finally:
+                engine.dispose()
+    document = {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'dodotable': __version__,
+        },
+        'results': results,
+    }
+    if args.output == '-':
+        json.dump(document, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+
+def compare(args):
+    def load(path):
+        with open(path) as f:
+            document = json.load(f)
+        return dict(((r['case'], r['rows'], r['columns']), r)
+                    for r in document['results'])
+    before = load(args.before)
+    after = load(args.after)
+    regressions = 0
+    for key in sorted(set(before) & set(after)):
+        old = before[key][args.metric]
+        new = after[key][args.metric]
+        ratio = new / old if old else float('inf')
+        regressed = ratio > 1 + args.threshold
+        regressions += regressed
+        print('{0:>24} rows={1:<8} columns={2:<3} {3:.6f}s -> {4:.6f}s '
+              '({5:+.1%}){6}'.format(key[0], key[1], key[2], old, new,
+                                     ratio - 1,
+                                     '  REGRESSION' if regressed else ''))
+    if regressions:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('--rows', type=int, nargs='+',
+                            default=list(DEFAULT_ROWS))
+    run_parser.add_argument('--columns', type=int, nargs='+',
+                            default=list(DEFAULT_COLUMNS))
+    run_parser.add_argument('--case', action='append', choices=list(CASES),
+                            help='run only the given case (repeatable)')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--data-dir',
+                            default=os.path.join(tempfile.gettempdir(),
+                                                 'dodotable-benchmarks'))
+    run_parser.add_argument('-o', '--output', default='-',
+                            help='JSON output file (default: stdout)')
+    run_parser.set_defaults(function=run)
+    compare_parser = subparsers.add_parser(
+        'compare', help='compare two JSON outputs of run'
+    )
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--metric', default='median',
+                                choices=['min', 'median', 'mean', 'max'])
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='tolerated slowdown ratio '
+                                     '(default: %(default)s)')
+    compare_parser.set_defaults(function=compare)
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+""":mod:`benchmarks.cases` --- measured hot paths
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Every case is a function registered with :func:`case`.  It takes a
+:class:`Fixture`, does its setup and returns a nullary function which is the
+only part that gets timed.
+
+"""
+import collections
+import threading
+
+from dodotable.boundary import PageBoundaryIndex
+from dodotable.condition import Ilike, IlikeSet, SelectFilter, \
+    create_search_name
+from dodotable.environment import Environment
+from dodotable.fragment import RowFragmentCache
+from dodotable.memory import MemorySource
+from dodotable.schema import Column, Table, TableDefinition, TableGroup
+from dodotable.singleflight import SingleFlight
+from dodotable.totals import TotalCounter
+from dodotable.util import _get_data, camel_to_underscore, to_json
+
+from .fixtures import CATEGORIES, SEARCH_WORD, open_session
+
+
+__all__ = (
+    'CASES', 'BenchmarkEnvironment', 'Fixture', 'case', 'make_table',
+)
+
+
+#: (:class:`collections.OrderedDict`) registered cases by their name.
+CASES = collections.OrderedDict()
+
+#: A database fixture a case runs against.
+Fixture = collections.namedtuple('Fixture',
+                                 ['engine', 'model', 'session', 'rows',
+                                  'columns'])
+
+
+class BenchmarkEnvironment(Environment):
+
+    def build_url(self, *args, **kwargs):
+        queries = ['{}={}'.format(k, v) for k, v in kwargs.items()]
+        return '/?{}'.format('&'.join(sorted(queries)))
+
+    def get_session(self):
+        return None
+
+
+def case(name):
+    """Register the decorated function as a benchmark case."""
+    def decorator(function):
+        CASES[name] = function
+        return function
+    return decorator
+
+
+def search_args(model):
+    name = create_search_name(camel_to_underscore(model.__name__))
+    return {name['type']: 'name', name['word']: SEARCH_WORD}
+
+
+def make_columns(model, request_args, cls=None):
+    if cls is None:
+        cls = model
+    columns = []
+    for column in model.__table__.columns:
+        filters = []
+        if column.key == 'name':
+            filters.append(Ilike(cls, 'name', request_args))
+        order_by = 'id.desc' if column.key == 'id' else None
+        columns.append(Column(attr=column.key, label=column.key,
+                              order_by=order_by, filters=filters))
+    return columns
+
+
+def make_table(fixture, request_args=None, cls=None):
+    """Build a :class:`~dodotable.schema.Table` showing every column of the
+    fixture's model, from ``cls`` (the model by default).
+
+    """
+    if request_args is None:
+        request_args = {}
+    model = fixture.model
+    if cls is None:
+        cls = model
+    return Table(cls=cls, label=model.__name__,
+                 columns=make_columns(model, request_args, cls),
+                 sqlalchemy_session=fixture.session)
+
+
+@case('build_table')
+def build_table(fixture):
+    request_args = search_args(fixture.model)
+
+    def build():
+        table = make_table(fixture, request_args)
+        table.add_filter(IlikeSet(table, request_args))
+    return build
+
+
+@case('bind_table_definition')
+def bind_table_definition(fixture):
+    request_args = search_args(fixture.model)
+    definition = TableDefinition(
+        fixture.model, fixture.model.__name__,
+        columns=make_columns(fixture.model, {}),
+        filters=[lambda table, args: IlikeSet(table, args)]
+    )
+    return lambda: definition.bind(fixture.session, request_args)
+
+
+@case('count')
+def count(fixture):
+    table = make_table(fixture)
+    return lambda: table.count
+
+
+@case('count_total_counter')
+def count_total_counter(fixture):
+    total_counter = TotalCounter(fixture.model)
+
+    def count_total():
+        table = make_table(fixture)
+        table.total_counter = total_counter
+        return table.count
+    return count_total
+
+
+@case('select')
+def select(fixture):
+    table = make_table(fixture)
+    return lambda: table.select(offset=0, limit=10)
+
+
+@case('select_deep_offset')
+def select_deep_offset(fixture):
+    table = make_table(fixture)
+    offset = max(fixture.rows // 2, 0)
+    return lambda: table.select(offset=offset, limit=10)
+
+
+@case('select_deep_offset_page_index')
+def select_deep_offset_page_index(fixture):
+    page_index = PageBoundaryIndex()
+    offset = max(fixture.rows // 2 // 10 * 10, 0)
+
+    def select_page():
+        table = make_table(fixture)
+        table.page_index = page_index
+        return table.select(offset=offset, limit=10)
+    return select_page
+
+
+@case('select_limit_500')
+def select_limit_500(fixture):
+    table = make_table(fixture)
+    return lambda: table.select(offset=0, limit=500)
+
+
+@case('html_streamed_limit_500')
+def html_streamed_limit_500(fixture):
+    table = make_table(fixture)
+    return lambda: table.select(offset=0, limit=500,
+                                batch_size=100).__html__()
+
+
+@case('html')
+def html(fixture):
+    table = make_table(fixture).select(offset=0, limit=10)
+    return table.__html__
+
+
+@case('select_html')
+def select_html(fixture):
+    total_counter = TotalCounter(fixture.model)
+
+    def select_page():
+        table = make_table(fixture)
+        table.total_counter = total_counter
+        return table.select(offset=0, limit=10).__html__()
+    return select_page
+
+
+@case('select_html_row_cache')
+def select_html_row_cache(fixture):
+    """``select_html`` of a page whose rows are cached.  ``id`` stands
+    for a version column.
+
+    """
+    total_counter = TotalCounter(fixture.model)
+    row_cache = RowFragmentCache()
+
+    def select_page():
+        table = make_table(fixture)
+        table.total_counter = total_counter
+        table.version_attr = 'id'
+        table.row_cache = row_cache
+        return table.select(offset=0, limit=10).__html__()
+    return select_page
+
+
+@case('etag')
+def etag(fixture):
+    """The version check answering a conditional request, against
+    ``select_html`` which answers a full one.  ``id`` stands for an indexed
+    version column.
+
+    """
+    total_counter = TotalCounter(fixture.model)
+
+    def make_etag():
+        table = make_table(fixture)
+        table.total_counter = total_counter
+        table.version_attr = 'id'
+        return table.etag(offset=0, limit=10)
+    return make_etag
+
+
+@case('json')
+def json(fixture):
+    table = make_table(fixture)
+    return lambda: to_json(table.select(offset=0, limit=10))
+
+
+@case('pager_pages')
+def pager_pages(fixture):
+    table = make_table(fixture).select(offset=fixture.rows // 2, limit=10)
+    return lambda: table.pager.pages
+
+
+@case('ilike_set_select')
+def ilike_set_select(fixture):
+    request_args = search_args(fixture.model)
+    table = make_table(fixture, request_args)
+    table.add_filter(IlikeSet(table, request_args))
+    return lambda: table.select(offset=0, limit=10)
+
+
+@case('select_filter_select')
+def select_filter_select(fixture):
+    table = make_table(fixture)
+    choices = [{'name': c, 'description': c} for c in CATEGORIES]
+    table.add_filter(SelectFilter(fixture.model, 'category', choices,
+                                  {'select.category': CATEGORIES[0]}))
+    return lambda: table.select(offset=0, limit=10)
+
+
+@case('export')
+def export(fixture):
+    table = make_table(fixture)
+    columns = table.columns
+
+    def export_rows():
+        return [[_get_data(row, column.attr, None) for column in columns]
+                for row in table.query]
+    return export_rows
+
+
+@case('table_group_select')
+def table_group_select(fixture):
+    def select_group():
+        tables = [make_table(fixture) for _ in range(6)]
+        with TableGroup(tables) as group:
+            group.select()
+    return select_group
+
+
+def select_concurrently(fixture, singleflight, threads=8):
+    """Select the same deep page from ``threads`` threads at once, each on
+    its own session like concurrent requests.
+
+    """
+    offset = max(fixture.rows // 2, 0)
+    sessions = [open_session(fixture.engine) for _ in range(threads)]
+
+    def select_page(session):
+        table = make_table(fixture)
+        table.session = session
+        table.singleflight = singleflight
+        table.select(offset=offset, limit=10)
+
+    def select_all():
+        workers = [threading.Thread(target=select_page, args=(session,))
+                   for session in sessions]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return select_all
+
+
+@case('select_concurrent')
+def select_concurrent(fixture):
+    return select_concurrently(fixture, None)
+
+
+@case('select_concurrent_singleflight')
+def select_concurrent_singleflight(fixture):
+    return select_concurrently(fixture, SingleFlight())
+
+
+def make_memory_source(fixture):
+    model = fixture.model
+    keys = [column.key for column in model.__table__.columns]
+    Record = collections.namedtuple(model.__name__, keys)
+    records = [Record(*row) for row in fixture.session.query(
+        *[getattr(model, key) for key in keys]
+    )]
+    return MemorySource(records)
+
+
+@case('memory_select_deep_offset')
+def memory_select_deep_offset(fixture):
+    table = make_table(fixture, cls=make_memory_source(fixture))
+    offset = max(fixture.rows // 2, 0)
+    return lambda: table.select(offset=offset, limit=10)
+
+
+@case('memory_ilike_set_select')
+def memory_ilike_set_select(fixture):
+    source = make_memory_source(fixture)
+    request_args = search_args(source)
+    table = make_table(fixture, request_args, source)
+    table.add_filter(IlikeSet(table, request_args))
+    return lambda: table.select(offset=0, limit=10)
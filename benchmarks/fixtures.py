@@ -0,0 +1,105 @@
+""":mod:`benchmarks.fixtures` --- SQLite fixtures for benchmarks
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+"""
+import os.path
+
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import Column
+from sqlalchemy.types import Integer, Unicode
+try:
+    from sqlalchemy.orm import declarative_base
+except ImportError:
+    from sqlalchemy.ext.declarative import declarative_base
+
+
+__all__ = (
+    'CATEGORIES', 'SEARCH_WORD', 'build_fixture', 'make_model',
+    'open_session',
+)
+
+
+#: (:class:`tuple`) values of the ``category`` column, used for
+#: :class:`~dodotable.condition.SelectFilter` benchmarks.
+CATEGORIES = 'genre', 'country', 'mood', 'era'
+
+#: (:class:`str`) a word contained in about 1% of ``name`` values.
+SEARCH_WORD = u'needle'
+
+#: (:class:`int`) the number of rows inserted per statement.
+INSERT_CHUNK = 10000
+
+
+def make_model(columns):
+    """Create a mapped class like :class:`tests.entities.Music` with the
+    given number of ``columns`` (including ``id``, ``name`` and
+    ``category``).
+
+    """
+    if columns < 3:
+        raise ValueError('columns must be at least 3, not {!r}'.format(
+            columns
+        ))
+    base = declarative_base()
+    attributes = {
+        '__tablename__': 'record',
+        'id': Column(Integer, primary_key=True),
+        'name': Column(Unicode, nullable=False),
+        'category': Column(Unicode, nullable=False),
+    }
+    for i in range(columns - 3):
+        type_ = Integer if i % 2 else Unicode
+        attributes['field_{}'.format(i)] = Column(type_, nullable=True)
+    return type('Record{}'.format(columns), (base,), attributes)
+
+
+def _make_row(model, i):
+    row = {
+        'id': i + 1,
+        'name': u'{} {}'.format(SEARCH_WORD if i % 100 == 0 else u'item', i),
+        'category': CATEGORIES[i % len(CATEGORIES)],
+    }
+    for column in model.__table__.columns:
+        if column.key in row:
+            continue
+        if isinstance(column.type, Integer):
+            row[column.key] = (i * 7919) % 100003
+        else:
+            row[column.key] = u'{}-{}'.format(column.key, i % 997)
+    return row
+
+
+def build_fixture(data_dir, rows, columns):
+    """Create (or reuse) a SQLite database with ``rows`` records of a model
+    with ``columns`` columns.
+
+    :return: a pair of the engine and the mapped class
+    :rtype: :class:`tuple`
+
+    """
+    model = make_model(columns)
+    path = os.path.join(data_dir,
+                        'bench_{}_{}.sqlite'.format(rows, columns))
+    engine = create_engine('sqlite:///{}'.format(path))
+    if os.path.exists(path):
+        session = open_session(engine)
+        try:
+            count = session.query(model).count()
+        finally:
+            session.close()
+        if count == rows:
+            return engine, model
+        model.metadata.drop_all(bind=engine)
+    model.metadata.create_all(bind=engine)
+    insert = model.__table__.insert()
+    for start in range(0, rows, INSERT_CHUNK):
+        chunk = [_make_row(model, i)
+                 for i in range(start, min(start + INSERT_CHUNK, rows))]
+        with engine.begin() as connection:
+            connection.execute(insert, chunk)
+    return engine, model
+
+
+def open_session(engine):
+    return Session(bind=engine)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.boundary` --- page boundary index
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+``OFFSET`` makes the database read and throw away every row before a page,
+so numbered page links far from the first page (e.g. the last one) are
+slow.  A :class:`PageBoundaryIndex` given to
+:class:`~dodotable.schema.Table` samples the sort key of the last row of
+every page once, so a page is sought right after the boundary of the
+previous page by a keyset condition instead.
+
+.. code-block:: python
+
+   page_index = PageBoundaryIndex(maxsize=64, ttl=300)
+
+   @app.route('/musics/')
+   def list_musics():
+       table = Table(cls=Music, label='music', columns=[...],
+                     page_index=page_index)
+       return render_template('musics.html',
+                              table=table.select(offset, limit))
+
+Boundaries are kept for each filter and order state and page size, and
+sampled by a window function (``row_number()``) a few pages ahead of the
+requested page at a time.  They're sampled again after ``ttl``, so pages
+may be off while rows are inserted or deleted in the meantime.
+
+"""
+import collections
+import threading
+
+from sqlalchemy import func
+
+from .cache import LRUCache
+from .util import query_key
+
+
+__all__ = 'Boundaries', 'PageBoundaryIndex'
+
+
+#: Sampled boundaries of pages.  ``values`` are sort key values of the
+#: last row of each page, and ``complete`` tells whether every page is
+#: sampled.
+Boundaries = collections.namedtuple('Boundaries', ['values', 'complete'])
+
+
+class PageBoundaryIndex(object):
+    """Sort key values of the last row of every page, cached by the filter
+    and order state of tables.
+
+    :param int maxsize: the maximum number of cached states
+    :param ttl: seconds sampled boundaries live
+    :type ttl: :class:`numbers.Real`
+    :param int pages_ahead: the number of pages sampled beyond the requested
+                            page, so the next pages don't sample again
+
+    """
+
+    def __init__(self, maxsize=64, ttl=300, pages_ahead=10):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.pages_ahead = pages_ahead
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(table, limit):
+        """Make the cache key of the table's state and the page size."""
+        return query_key(table.query), int(limit)
+
+    def boundary(self, table, orders, offset, limit):
+        """Get the sort key values of the last row of the page before
+        ``offset``.  Boundaries are sampled unless they're cached.
+
+        :param table: the table
+        :type table: :class:`~dodotable.schema.Table`
+        :param orders: the sort criteria of the table
+        :param int offset: the offset of the page
+        :param int limit: the size of pages
+        :return: sort key values, or :const:`None` if the page can't be
+                 sought (e.g. ``offset`` isn't a multiple of ``limit``,
+                 it's beyond the last page, or a value is ``NULL``)
+        :rtype: :class:`tuple`
+
+        """
+        offset = int(offset)
+        limit = int(limit)
+        if offset <= 0 or limit <= 0 or offset % limit:
+            return None
+        page = offset // limit
+        key = self.key(table, limit)
+        boundaries = self.cache.get(key) or Boundaries((), False)
+        if len(boundaries.values) < page and not boundaries.complete:
+            with self._lock:
+                boundaries = self.cache.get(key) or Boundaries((), False)
+                if len(boundaries.values) < page and \
+                   not boundaries.complete:
+                    boundaries = self._extend(table, orders, limit,
+                                              boundaries,
+                                              page + self.pages_ahead)
+                    self.cache.set(key, boundaries)
+        if len(boundaries.values) < page:
+            return None
+        values = boundaries.values[page - 1]
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _extend(self, table, orders, limit, boundaries, pages):
+        """Sample boundaries of pages after the last sampled one, up to
+        ``pages`` in total.
+
+        """
+        from .condition import Keyset
+        query = table.build_base_query()
+        if boundaries.values:
+            query = query.filter(
+                Keyset(orders, boundaries.values[-1],
+                       nulls_first=table._nulls_first).__query__()
+            )
+        row_number = func.row_number().over(
+            order_by=[o.__query__() for o in orders]
+        )
+        subquery = query.with_entities(*(
+            [o.attribute.label('key_{}'.format(i))
+             for i, o in enumerate(orders)] +
+            [row_number.label('row_number')]
+        )).order_by(None).subquery()
+        columns = list(subquery.c)
+        number = columns[-1]
+        wanted = pages - len(boundaries.values)
+        sampled = table.session_for('select').query(*columns[:-1]).filter(
+            number % limit == 0,
+            number <= wanted * limit
+        ).order_by(number).all()
+        values = boundaries.values + tuple(tuple(row) for row in sampled)
+        return Boundaries(values, len(sampled) < wanted)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.cache` --- bounded in-memory cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+"""
+import collections
+import threading
+import time
+
+
+__all__ = 'LRUCache',
+
+
+#: (:class:`~collections.abc.Callable`) a clock which doesn't go backward.
+clock = getattr(time, 'monotonic', time.time)
+
+
+class LRUCache(object):
+    """A thread-safe mapping which keeps at most ``maxsize`` items and
+    drops the least recently used one first.
+
+    .. code-block:: python
+
+       >>> cache = LRUCache(maxsize=2, ttl=60)
+       >>> cache.set('a', 1)
+       >>> cache.get('a')
+       1
+
+    :param int maxsize: the maximum number of items
+    :param ttl: seconds an item lives.  :const:`None` means forever
+    :type ttl: :class:`numbers.Real`
+
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive, not {!r}'.format(
+                maxsize
+            ))
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get the item of ``key`` unless it's expired."""
+        with self._lock:
+            try:
+                value, expires_at = self._items.pop(key)
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at <= clock():
+                return default
+            self._items[key] = value, expires_at
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Set the item of ``key``.
+
+        :param ttl: seconds the item lives.  :attr:`ttl` by default
+
+        """
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = None if ttl is None else clock() + ttl
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value, expires_at
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove the item of ``key`` and return it unless it's expired."""
+        with self._lock:
+            try:
+                value, expires_at = self._items.pop(key)
+            except KeyError:
+                return default
+        if expires_at is not None and expires_at <= clock():
+            return default
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key):
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self):
+        return len(self._items)
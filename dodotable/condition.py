@@ -3,12 +3,17 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 """
-from six import string_types
-from sqlalchemy.sql.expression import asc, desc, false, null, or_
+import datetime
 
-from .exc import BadChoice
+from six import string_types, text_type
+from sqlalchemy.sql.expression import and_, asc, desc, false, null, or_
+from sqlalchemy.types import Date, DateTime
+
+from .cache import LRUCache
+from .exc import BadChoice, BadCursor, BadRange
+from .memory import MemorySource, all_of, any_of
 from .schema import Queryable, Renderable, Schema
-from .util import camel_to_underscore, _get_data
+from .util import camel_to_underscore, query_key, _get_data
 
 
 class _Filter(Schema):
@@ -29,6 +34,16 @@ class SelectFilter(_Filter, Queryable, Renderable):
 
     """
 
+    #: (:class:`dict`) the number of rows of each choice by its name,
+    #: counted by :meth:`~dodotable.schema.Table.count_facets`.
+    #: :const:`None` if they aren't counted
+    counts = None
+
+    #: (:class:`bool`) whether :attr:`choices` are only some of possible
+    #: values, so the widget lets people type a value rather than choose
+    #: one of every value
+    truncated = False
+
     def __init__(self, cls, attribute_name, choices, request_args,
                  default=None):
         self.cls = cls
@@ -38,6 +53,25 @@ class SelectFilter(_Filter, Queryable, Renderable):
         self.choices = [{'name': 'all', 'description': u'모두'}] + choices
         self.default = default
 
+    def count_choices(self, groups):
+        """Count rows of each choice from the number of rows of each value
+        of the attribute.  ``'all'`` counts rows of the listed choices,
+        which are shown when nothing is selected.
+
+        :param groups: pairs of a value and its number of rows
+        :return: the number of rows of each choice by its name
+        :rtype: :class:`dict`
+
+        """
+        groups = dict(groups)
+        counts = {}
+        for choice in self.choices:
+            name = choice['name']
+            if name != 'all':
+                counts[name] = groups.get(name, 0)
+        counts['all'] = sum(counts.values())
+        return counts
+
     def __query__(self):
         arg_name = 'select.{}'.format(self.attribute_name)
         s = self.request_args.get(arg_name, self.default)
@@ -45,7 +79,7 @@ class SelectFilter(_Filter, Queryable, Renderable):
         if not s:
             q = self.attribute.in_(choices)
         elif s not in choices:
-            raise BadChoice(description='Invalid choices for `{}`: {}'.format(
+            raise BadChoice('Invalid choices for `{}`: {}'.format(
                 arg_name,
                 s
             ))
@@ -59,6 +93,155 @@ class SelectFilter(_Filter, Queryable, Renderable):
         return self.render('select_filter.html', filter=self)
 
 
+class DistinctSelectFilter(SelectFilter):
+    """A :class:`SelectFilter` whose choices are distinct values of the
+    attribute (``SELECT DISTINCT``), or rows of a lookup query of a value
+    and its description.  They're cached by :attr:`cache` per database,
+    model and attribute (or lookup query) for ``ttl`` seconds, and loaded
+    on the read session of the environment (see :mod:`dodotable.routing`)
+    unless ``session`` is given.
+
+    Unlike :class:`SelectFilter`, no selection filters nothing rather than
+    rows of the listed choices, and ``'all'`` counts rows of every value.
+    If there are more than ``max_choices`` values, only the first ones are
+    rendered as suggestions of a text input and any value can be selected,
+    and :meth:`search_choices` looks values up by their prefix, e.g. for
+    autocompletion.
+
+    .. code-block:: python
+
+       >>> genres = session.query(Genre.code, Genre.name).order_by(Genre.name)
+       >>> table.add_filter(DistinctSelectFilter(Music, 'genre_code',
+       ...                                       request_args,
+       ...                                       lookup=genres))
+
+    :param cls:
+    :param attribute_name:
+    :param request_args:
+    :type request_args: :class:`~collections.abc.Mapping`
+    :param default:
+    :param session: a session to query values.  the environment's session
+                    routed for ``'choices'`` by default
+    :type session: :class:`~sqlalchemy.orm.session.Session`
+    :param lookup: a query of values, and optionally their descriptions
+    :type lookup: :class:`~sqlalchemy.orm.query.Query`
+    :param ttl: seconds choices are cached.  the ttl of :attr:`cache`
+                by default
+    :type ttl: :class:`numbers.Real`
+    :param int max_choices: the maximum number of rendered choices
+    :param describe: a function which describes a value.
+                     :func:`six.text_type` by default
+
+    """
+
+    #: (:class:`~dodotable.cache.LRUCache`) loaded values and descriptions.
+    cache = LRUCache(maxsize=256, ttl=300)
+
+    def __init__(self, cls, attribute_name, request_args, default=None,
+                 session=None, lookup=None, ttl=None, max_choices=100,
+                 describe=text_type):
+        self.cls = cls
+        self.attribute = getattr(cls, attribute_name)
+        self.attribute_name = attribute_name
+        self.request_args = request_args
+        self.default = default
+        self.session = session
+        self.lookup = lookup
+        self.ttl = ttl
+        self.max_choices = max_choices
+        self.describe = describe
+
+    def search_choices(self, word=None, offset=0, limit=None):
+        """Look values up.  They aren't cached.
+
+        :param str word: the prefix of values to look up
+        :param int offset: the number of values to skip
+        :param int limit: the maximum number of values
+        :return: pairs of a value and its description
+        :rtype: :class:`list`
+
+        """
+        if isinstance(self.cls, MemorySource):
+            values = [value for value, _ in
+                      self.cls.query().count_groups(self.attribute_name)
+                      if value is not None]
+            if word:
+                word = text_type(word).lower()
+                values = [v for v in values
+                          if text_type(v).lower().startswith(word)]
+            stop = None if limit is None else offset + limit
+            return [(v, self.describe(v)) for v in values[offset:stop]]
+        if self.lookup is not None:
+            query = self.lookup
+            if query.session is None:
+                query = query.with_session(self._get_session())
+            column = query.column_descriptions[0]['expr']
+        else:
+            query = self._get_session().query(self.attribute).filter(
+                self.attribute.isnot(null())
+            ).distinct().order_by(self.attribute)
+            column = self.attribute
+        if word:
+            query = query.filter(column.ilike(u'{}%'.format(word)))
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return [(row[0], row[1] if len(row) > 1 else self.describe(row[0]))
+                for row in query]
+
+    def _get_session(self):
+        if self.session is None:
+            return self.environment.route_session(None, 'choices')
+        return self.session
+
+    def _load(self):
+        if isinstance(self.cls, MemorySource):
+            key = self.cls, self.attribute_name
+        elif self.lookup is None:
+            bind = self._get_session().get_bind(self.cls)
+            key = text_type(bind.engine.url), self.cls, self.attribute_name
+        else:
+            session = self.lookup.session or self._get_session()
+            bind = session.get_bind(clause=self.lookup.statement)
+            key = text_type(bind.engine.url), query_key(self.lookup)
+        values = self.cache.get(key)
+        if values is None:
+            values = self.search_choices(limit=self.max_choices + 1)
+            self.cache.set(key, values, ttl=self.ttl)
+        return values
+
+    @property
+    def truncated(self):
+        return len(self._load()) > self.max_choices
+
+    @property
+    def choices(self):
+        return [{'name': 'all', 'description': u'모두'}] + [
+            {'name': text_type(value), 'description': description}
+            for value, description in self._load()[:self.max_choices]
+        ]
+
+    def count_choices(self, groups):
+        groups = list(groups)
+        counts = dict((text_type(value), count) for value, count in groups
+                      if value is not None)
+        counts['all'] = sum(count for _, count in groups)
+        return counts
+
+    def __query__(self):
+        arg_name = 'select.{}'.format(self.attribute_name)
+        s = self.request_args.get(arg_name, self.default)
+        if not s or s == 'all':
+            return None
+        for value, _ in self._load()[:self.max_choices]:
+            if text_type(value) == s:
+                return self.attribute == value
+        if self.truncated:
+            return self.attribute == s
+        raise BadChoice('Invalid choices for `{}`: {}'.format(arg_name, s))
+
+
 class NullSelectableSelectFilter(SelectFilter):
 
     NULL = 'null'
@@ -74,6 +257,223 @@ class NullSelectableSelectFilter(SelectFilter):
             q = self.attribute.isnot(null())
         return q
 
+    def count_choices(self, groups):
+        groups = dict(groups)
+        counts = super(NullSelectableSelectFilter, self).count_choices(groups)
+        null_count = groups.get(None, 0)
+        counts[self.NULL] = null_count
+        counts[self.NOT_NULL] = sum(groups.values()) - null_count
+        return counts
+
+
+class RangeFilter(_Filter, Queryable, Renderable):
+    """Filter rows whose attribute is in a half-open range
+    ``[from, to)`` given by ``range.<attribute_name>.from`` and
+    ``range.<attribute_name>.to`` of request arguments, or by a preset
+    chosen by ``range.<attribute_name>.preset``.
+
+    It compares the attribute itself (``>=`` and ``<``), so the database
+    can scan an index of it or prune partitions by it.  Use its subclasses
+    :class:`DateRange` and :class:`NumericRange`.
+
+    :param cls:
+    :param attribute_name:
+    :param request_args:
+    :type request_args: :class:`~collections.abc.Mapping`
+    :param presets: choices of ranges.  each one is a mapping of ``name``,
+                    ``description`` and ``bounds``, a pair of bounds
+    :type presets: :class:`~collections.abc.Sequence`
+
+    """
+
+    #: (:class:`str`) The ``type`` of inputs of the bounds.
+    input_type = 'text'
+
+    def __init__(self, cls, attribute_name, request_args, presets=()):
+        self.cls = cls
+        self.attribute = getattr(cls, attribute_name)
+        self.attribute_name = attribute_name
+        self.request_args = request_args
+        self.presets = list(presets)
+        prefix = 'range.{}.'.format(attribute_name)
+        self.arg_from_name = prefix + 'from'
+        self.arg_to_name = prefix + 'to'
+        self.arg_preset_name = prefix + 'preset'
+        self._parsed = None
+
+    def parse(self, value):
+        """Parse a bound given by request arguments.
+
+        :raise dodotable.exc.BadRange: when the value is malformed
+
+        """
+        raise NotImplementedError()
+
+    def parse_upper(self, value):
+        """Parse the upper bound given by request arguments."""
+        return self.parse(value)
+
+    def preset_bounds(self, preset):
+        """Get the bounds of a preset."""
+        return preset['bounds']
+
+    @property
+    def bounds(self):
+        """(:class:`tuple`) The lower and the upper bound, each of which is
+        :const:`None` if it's not given.  Request arguments are parsed once.
+
+        :raise dodotable.exc.BadRange: when request arguments are malformed
+
+        """
+        request_args = self.request_args
+        if self._parsed is not None and self._parsed[0] is request_args:
+            return self._parsed[1]
+        preset_name = request_args.get(self.arg_preset_name)
+        if preset_name:
+            for preset in self.presets:
+                if preset['name'] == preset_name:
+                    bounds = tuple(self.preset_bounds(preset))
+                    break
+            else:
+                raise BadRange('Invalid preset for `{}`: {}'.format(
+                    self.arg_preset_name, preset_name
+                ))
+        else:
+            lower = request_args.get(self.arg_from_name)
+            upper = request_args.get(self.arg_to_name)
+            bounds = (self.parse(lower) if lower else None,
+                      self.parse_upper(upper) if upper else None)
+        self._parsed = request_args, bounds
+        return bounds
+
+    def __query__(self):
+        lower, upper = self.bounds
+        conditions = []
+        if lower is not None:
+            conditions.append(self.attribute >= lower)
+        if upper is not None:
+            conditions.append(self.attribute < upper)
+        if not conditions:
+            return None
+        elif len(conditions) == 1:
+            return conditions[0]
+        elif isinstance(self.cls, MemorySource):
+            return all_of(*conditions)
+        return and_(*conditions)
+
+    def __html__(self):
+        return self.render('range_filter.html', filter=self)
+
+
+class DateRange(RangeFilter):
+    """Filter rows by a range of dates or datetimes, e.g.::
+
+        ?range.created_at.from=2017-01-01&range.created_at.to=2017-01-31
+
+    A date of ``to`` includes the day, i.e. the upper bound becomes the
+    next day.  Presets are relative to ``now``: a mapping of ``delta``
+    (:class:`datetime.timedelta`) instead of ``bounds`` selects the rows
+    since ``delta`` before, e.g. :data:`LAST_24_HOURS`.  It's truncated to
+    the minute so the query is the same for a minute.
+
+    :param cls:
+    :param attribute_name:
+    :param request_args:
+    :param presets: :data:`DEFAULT_PRESETS` by default
+    :param now: a nullary function which returns the current time.
+                :meth:`datetime.datetime.utcnow` by default
+    :param bool date_only: whether bounds are :class:`datetime.date`
+                           rather than :class:`datetime.datetime`.
+                           if it's omitted, it's whether the attribute is
+                           a :class:`~sqlalchemy.types.Date` column
+
+    """
+
+    #: The preset of the last 24 hours.
+    LAST_24_HOURS = {'name': '24h', 'description': u'Last 24 hours',
+                     'delta': datetime.timedelta(hours=24)}
+
+    #: The preset of the last 7 days.
+    LAST_7_DAYS = {'name': '7d', 'description': u'Last 7 days',
+                   'delta': datetime.timedelta(days=7)}
+
+    #: The preset of the last 30 days.
+    LAST_30_DAYS = {'name': '30d', 'description': u'Last 30 days',
+                    'delta': datetime.timedelta(days=30)}
+
+    DEFAULT_PRESETS = LAST_24_HOURS, LAST_7_DAYS, LAST_30_DAYS
+
+    input_type = 'date'
+
+    def __init__(self, cls, attribute_name, request_args,
+                 presets=DEFAULT_PRESETS, now=None, date_only=None):
+        super(DateRange, self).__init__(cls, attribute_name, request_args,
+                                        presets)
+        self.now = now or datetime.datetime.utcnow
+        if date_only is None:
+            type_ = getattr(self.attribute, 'type', None)
+            date_only = (isinstance(type_, Date) and
+                         not isinstance(type_, DateTime))
+        self.date_only = date_only
+
+    def _parse(self, value):
+        value = value.strip()
+        for format_ in ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M',
+                        '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+            try:
+                return datetime.datetime.strptime(value, format_)
+            except ValueError:
+                continue
+        raise BadRange('Invalid date for `{}`: {}'.format(self.attribute_name,
+                                                          value))
+
+    def parse(self, value):
+        parsed = self._parse(value)
+        return parsed.date() if self.date_only else parsed
+
+    def parse_upper(self, value):
+        upper = self.parse(value)
+        if self.date_only or len(value.strip()) == 10:
+            upper += datetime.timedelta(days=1)
+        return upper
+
+    def preset_bounds(self, preset):
+        if 'delta' not in preset:
+            return preset['bounds']
+        lower = self.now().replace(second=0, microsecond=0) - preset['delta']
+        return (lower.date() if self.date_only else lower), None
+
+
+class NumericRange(RangeFilter):
+    """Filter rows by a range of numbers, e.g.::
+
+        ?range.price.from=10&range.price.to=20
+
+    :param cls:
+    :param attribute_name:
+    :param request_args:
+    :param presets:
+    :param type_: the type of bounds, e.g. :class:`int` or
+                  :class:`decimal.Decimal`.  :class:`float` by default
+
+    """
+
+    input_type = 'number'
+
+    def __init__(self, cls, attribute_name, request_args, presets=(),
+                 type_=float):
+        super(NumericRange, self).__init__(cls, attribute_name, request_args,
+                                           presets)
+        self.type_ = type_
+
+    def parse(self, value):
+        try:
+            return self.type_(value)
+        except (TypeError, ValueError, ArithmeticError):
+            raise BadRange('Invalid number for `{}`: {}'.format(
+                self.attribute_name, value
+            ))
+
 
 def create_search_name(name):
     """Create a name for the HTML form.
@@ -218,14 +618,25 @@ class IlikeSet(_Filter, Queryable, Renderable):
         self.arg_type_name = name['type']
         self.request_args = request_args
 
+    @property
+    def search_columns(self):
+        """(:class:`list`) Columns which have :class:`Ilike` filters."""
+        return [column for column in self.table._columns
+                if any(isinstance(f, Ilike) for f in column.filters)]
+
     def __query__(self):
         filter_ = []
         for column in self.table._columns:
             for f in column.filters:
-                if isinstance(f, Ilike) and f.__query__() is not None:
-                    filter_.append(f.__query__())
-
-        return or_(*filter_) if filter_ else None
+                if isinstance(f, Ilike):
+                    q = f.__query__()
+                    if q is not None:
+                        filter_.append(q)
+        if not filter_:
+            return None
+        elif isinstance(self.table.cls, MemorySource):
+            return any_of(*filter_)
+        return or_(*filter_)
 
     def __html__(self):
         return self.render('ilike_set.html', filter=self)
@@ -248,6 +659,7 @@ class Order(Queryable):
     def __init__(self, cls, attribute_name, order=None):
         self.cls = cls
         self.order = order or self.DESCENDANT
+        self.attribute_name = attribute_name
         self.attribute = _get_data(cls, attribute_name, attribute_name)
 
     @classmethod
@@ -260,17 +672,7 @@ class Order(Queryable):
 
     @classmethod
     def of_column(cls, attr, order_by):
-        asc_order = cls.asc_order_name(attr)
-        desc_order = cls.desc_order_name(attr)
-        order = None
-        if not order_by or not isinstance(order_by, string_types):
-            return None
-        for o in order_by.split(','):
-            if o.strip() == asc_order:
-                order = cls.ASCENDANT
-            elif o.strip() == desc_order:
-                order = cls.DESCENDANT
-        return order
+        return SortSpec.parse(order_by).order_of(attr)
 
     def __query__(self):
         if self.order == self.DESCENDANT:
@@ -278,3 +680,177 @@ class Order(Queryable):
         elif self.order == self.ASCENDANT:
             query = asc(self.attribute)
         return query
+
+
+class SortSpec(object):
+    """Sort criteria requested by ``order_by`` of a querystring, e.g.
+    ``name.asc,id.desc``, in the requested priority.  Use :meth:`parse`
+    which parses the same string once.
+
+    .. code-block:: python
+
+       >>> spec = SortSpec.parse('name.asc, id.desc')
+       >>> spec.items
+       (('name', 'asc'), ('id', 'desc'))
+       >>> spec.priority_of('id')
+       1
+
+    :param items: pairs of an attribute name and an order
+
+    """
+
+    #: (:class:`~dodotable.cache.LRUCache`) parsed specs by their string.
+    cache = LRUCache(maxsize=256)
+
+    def __init__(self, items=()):
+        self.items = tuple(items)
+        self._positions = dict(
+            (attr, (i, order)) for i, (attr, order) in enumerate(self.items)
+        )
+
+    @classmethod
+    def parse(cls, order_by):
+        """Parse ``order_by``.  Invalid criteria are ignored.  If an
+        attribute is repeated its last order wins, as
+        :meth:`Order.of_column` did, but it keeps the priority of its
+        first criterion.
+
+        :param str order_by: comma-separated ``attr.order`` criteria
+        :rtype: :class:`SortSpec`
+
+        """
+        if not order_by or not isinstance(order_by, string_types):
+            return EMPTY_SORT_SPEC
+        spec = cls.cache.get(order_by)
+        if spec is None:
+            items = []
+            indices = {}
+            for criterion in order_by.split(','):
+                attr, _, order = criterion.strip().rpartition('.')
+                if not attr or \
+                   order not in (Order.ASCENDANT, Order.DESCENDANT):
+                    continue
+                if attr in indices:
+                    items[indices[attr]] = attr, order
+                else:
+                    indices[attr] = len(items)
+                    items.append((attr, order))
+            spec = cls(items)
+            cls.cache.set(order_by, spec)
+        return spec
+
+    def order_of(self, attr):
+        """The requested order of ``attr``, or :const:`None`."""
+        try:
+            return self._positions[attr][1]
+        except KeyError:
+            return None
+
+    def priority_of(self, attr):
+        """The position of ``attr`` in the criteria, or :const:`None`."""
+        try:
+            return self._positions[attr][0]
+        except KeyError:
+            return None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+EMPTY_SORT_SPEC = SortSpec()
+
+
+#: (:class:`frozenset`) Names of dialects which sort ``NULL`` after every
+#: value in ascending order.  The others (e.g. SQLite and MySQL) and
+#: :class:`~dodotable.memory.MemorySource` sort it before every value.
+NULLS_LAST_DIALECTS = frozenset(['oracle', 'postgresql'])
+
+
+def nulls_first(session):
+    """Tell whether ``NULL`` comes before every value in ascending order on
+    the database of the session.
+
+    :param session: a session, or :const:`None` for records in memory
+    :type session: :class:`~sqlalchemy.orm.session.Session`
+    :rtype: :class:`bool`
+
+    """
+    if session is None:
+        return True
+    return session.get_bind().dialect.name not in NULLS_LAST_DIALECTS
+
+
+def _nullable(attribute):
+    """Tell whether an attribute may be ``NULL``.  Only attributes of a
+    ``NOT NULL`` column are known not to be.
+
+    """
+    columns = getattr(getattr(attribute, 'property', None), 'columns', None)
+    if not columns:
+        return True
+    return getattr(columns[0], 'nullable', True)
+
+
+class Keyset(Queryable):
+    """Seek the rows after the given sort key values, i.e. keyset
+    pagination.
+
+    .. code-block:: python
+
+       >>> orders = [Order(Music, 'name', 'asc'), Order(Music, 'id', 'asc')]
+       >>> print(Keyset(orders, [u'9 crimes', 1]).__query__())
+       music.name > :name_1 OR music.name = :name_2 AND music.id > :id_1
+
+    ``NULL`` sort key values are sought by ``IS NULL`` and ``IS NOT NULL``
+    conditions where ``NULL`` sorts, since comparisons with ``NULL`` are
+    never true.
+
+    :param orders: sort criteria of the query
+    :type orders: :class:`~collections.abc.Sequence` of :class:`Order`
+    :param values: sort key values of the last row of the previous page
+    :param bool nulls_first: whether ``NULL`` comes before every value in
+                             ascending order, see :func:`nulls_first`
+
+    """
+
+    def __init__(self, orders, values, nulls_first=True):
+        if len(orders) != len(values):
+            raise BadCursor('expected {} sort key values, not {}'.format(
+                len(orders), len(values)
+            ))
+        self.orders = orders
+        self.values = values
+        self.nulls_first = nulls_first
+
+    def __query__(self):
+        memory = bool(self.orders) and \
+            isinstance(self.orders[0].cls, MemorySource)
+        if memory:
+            and_function, or_function = all_of, any_of
+        else:
+            and_function, or_function = and_, or_
+        conditions = []
+        equals = []
+        for order, value in zip(self.orders, self.values):
+            attribute = order.attribute
+            ascendant = order.order == Order.ASCENDANT
+            # Whether NULL comes first in the order of this attribute.
+            leading_nulls = ascendant == self.nulls_first
+            if value is None:
+                if leading_nulls:
+                    conditions.append(
+                        and_function(*(equals + [attribute.isnot(None)]))
+                    )
+                equals.append(attribute.is_(None))
+                continue
+            seek = attribute > value if ascendant else attribute < value
+            if not leading_nulls and (memory or _nullable(attribute)):
+                seek = or_function(seek, attribute.is_(None))
+            conditions.append(and_function(*(equals + [seek])))
+            equals.append(attribute == value)
+        if not conditions:
+            return false()
+        return or_function(*conditions)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.counter` --- SQL statement counter
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Catch N+1 queries (e.g. a :class:`~dodotable.schema.LinkedColumn` endpoint
+or a dotted ``attr`` which loads a relationship for every row) by counting
+the statements issued while a table is selected and rendered.
+
+.. code-block:: python
+
+   with table.count_queries(budget=2) as counter:
+       table.select(offset=0, limit=10)
+       html = table.__html__()
+   print(counter.statements)
+
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .exc import QueryBudgetExceeded
+
+
+__all__ = 'QueryCounter',
+
+
+class QueryCounter(object):
+    """Count SQL statements executed on an engine while it's entered as
+    a context manager.
+
+    :param bind: a session or an engine to listen to
+    :type bind: :class:`~sqlalchemy.orm.session.Session`,
+                :class:`~sqlalchemy.engine.Engine`
+    :param budget: the maximum number of statements.  if more statements
+                   are issued :exc:`~dodotable.exc.QueryBudgetExceeded`
+                   is raised on exit.  :const:`None` means no limit
+    :type budget: :class:`int`
+
+    .. note::
+
+       Every statement executed on the engine is counted, including ones
+       from other threads.
+
+    """
+
+    def __init__(self, bind, budget=None):
+        if isinstance(bind, Session):
+            bind = bind.get_bind()
+        self.engine = bind
+        self.budget = budget
+        #: (:class:`list`) executed SQL statements.
+        self.statements = []
+
+    @property
+    def count(self):
+        """(:class:`int`) The number of executed statements."""
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, 'before_cursor_execute',
+                     self._before_cursor_execute)
+        if (exc_type is None and self.budget is not None and
+                self.count > self.budget):
+            raise QueryBudgetExceeded(self.budget, self.statements)
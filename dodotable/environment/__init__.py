@@ -24,12 +24,28 @@ A good example is :class:`dodotable.environment.flask.FlaskEnvironment`.
 more examples are in it.
 
 """
+import contextlib
 import gettext
 import os.path
+import threading
+
+from six import PY2
+
+from ..routing import READ, RoutingPolicy
+from ..util import compile_templates, create_jinja_environment, render
 
 __all__ = 'Environment',
 
 
+#: (:class:`dict`) Types resolved from ``'module:name'`` strings by
+#: :meth:`Environment.isinstance`.
+_resolved_types = {}
+
+#: (:class:`dict`) Names of template globals of each environment class,
+#: listed by :meth:`Environment.__dict__`.
+_global_names = {}
+
+
 class Environment(object):
     """Top-level environment class, every environment class implemented by
     inherit this class.
@@ -41,17 +57,45 @@ class Environment(object):
                             if it's omitted or a return value is :const:`None`
                             English is shown.
     :type locale_selector: :class:`~collections.abc.Callable`
+    :param read_session_factory: a nullary function which returns a new
+                                 session for read-only queries, e.g. a
+                                 :class:`~sqlalchemy.orm.session.sessionmaker`
+                                 bound to a read replica.
+                                 see :meth:`get_read_session` and
+                                 :meth:`read_session_scope`
+    :type read_session_factory: :class:`~collections.abc.Callable`
+    :param routing_policy: decides which session operations of tables run
+                           on.  :class:`~dodotable.routing.RoutingPolicy`
+                           by default
+    :type routing_policy: :class:`~dodotable.routing.RoutingPolicy`
 
     """
 
     #: (:class:`tuple`) methods that
-    __env_methods__ = 'get_session',
+    __env_methods__ = ('get_session', 'get_url_cache', 'get_jinja_environment',
+                       'compile_templates', 'render', 'get_read_session',
+                       'close_read_session', 'read_session_scope',
+                       'route_session', 'copy_context')
+
+    #: (:class:`str`) a path of templates precompiled by
+    #: :meth:`compile_templates`.  if it's set they're loaded instead of
+    #: parsing and compiling templates of :attr:`template_loader`
+    compiled_templates = None
 
-    def __init__(self, locale_selector=None):
+    _read_session_factory = None
+
+    _routing_policy = RoutingPolicy()
+
+    def __init__(self, locale_selector=None, read_session_factory=None,
+                 routing_policy=None):
         if not (locale_selector is None or callable(locale_selector)):
             raise TypeError('locale_selector must be callable, not ' +
                             repr(locale_selector))
         self.get_locale = locale_selector
+        self._read_session_factory = read_session_factory
+        if routing_policy is not None:
+            self._routing_policy = routing_policy
+        self._local = threading.local()
 
     @property
     def template_loader(self):
@@ -69,6 +113,144 @@ class Environment(object):
     def get_session(self):
         raise NotImplementedError()
 
+    def get_read_session(self):
+        """Get the session for read-only queries of tables.  It's made by
+        ``read_session_factory`` once per request, so tables rendered in
+        a request share its connection.  This environment has no request,
+        so it keeps one per thread only inside :meth:`read_session_scope`,
+        which closes it.  Outside of scopes tables read on their default
+        sessions.
+
+        :return: the read session, or :const:`None` to read on the default
+                 session
+        :rtype: :class:`~sqlalchemy.orm.session.Session`
+
+        """
+        if self._read_session_factory is None or \
+           not getattr(self._local, 'read_scope_depth', 0):
+            return None
+        session = getattr(self._local, 'read_session', None)
+        if session is None:
+            session = self._read_session_factory()
+            self._local.read_session = session
+        return session
+
+    def close_read_session(self):
+        """Close the read session of the request, e.g. when the request
+        ends.
+
+        """
+        session = getattr(self._local, 'read_session', None)
+        if session is not None:
+            del self._local.read_session
+            session.close()
+
+    @contextlib.contextmanager
+    def read_session_scope(self):
+        """Keep the read session of the current thread while the ``with``
+        block runs (e.g. selecting and rendering tables of a request), and
+        close it when the block ends.  Scopes can be nested, and only the
+        outermost one closes the session.
+
+        .. code-block:: python
+
+           with environment.read_session_scope():
+               html = table.select(offset=0, limit=10).__html__()
+
+        """
+        depth = getattr(self._local, 'read_scope_depth', 0)
+        self._local.read_scope_depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.read_scope_depth = depth
+            if not depth:
+                # Not :meth:`close_read_session` which subclasses override
+                # to close sessions of their requests.
+                Environment.close_read_session(self)
+
+    def route_session(self, table, operation):
+        """Get the session an operation of the table runs on.
+
+        :param table: the table, or :const:`None` for an operation of no
+                      table, e.g. loading choices of
+                      :class:`~dodotable.condition.DistinctSelectFilter`
+        :type table: :class:`~dodotable.schema.Table`
+        :param str operation: the name of the operation,
+                              see :mod:`dodotable.routing`
+        :rtype: :class:`~sqlalchemy.orm.session.Session`
+
+        """
+        if self._routing_policy.route(table, operation) == READ:
+            session = table is not None and table.read_session or \
+                self.get_read_session()
+            if session is not None:
+                return session
+        return self.get_session() if table is None else table.session
+
+    def copy_context(self, function):
+        """Make ``function`` run in the context of the current request
+        when it's called in another thread, e.g. by
+        :meth:`TableGroup.select() <dodotable.schema.TableGroup.select>`.
+        This environment has no context, so ``function`` runs in its own
+        :meth:`read_session_scope` instead, which closes read sessions it
+        opened in the other thread.
+
+        :param function: a function to call in another thread
+        :return: the function which runs in the current context
+
+        """
+        def call(*args, **kwargs):
+            with self.read_session_scope():
+                return function(*args, **kwargs)
+        return call
+
+    def get_url_cache(self):
+        """Get a mapping to memoize urls of
+        :class:`~dodotable.schema.LinkedCell` during the current request.
+
+        :return: a mutable mapping which lives as long as the request,
+                 or :const:`None` not to memoize
+        :rtype: :class:`~collections.abc.MutableMapping`
+
+        """
+        return None
+
+    def get_jinja_environment(self):
+        """Get the Jinja environment to render templates by.  It's created
+        once and shared by renders of this environment, and created again
+        if :attr:`compiled_templates` is changed.
+
+        :rtype: :class:`jinja2.Environment`
+
+        """
+        compiled_templates = self.compiled_templates
+        try:
+            key, env = self._jinja_environment
+        except AttributeError:
+            pass
+        else:
+            if key == compiled_templates:
+                return env
+        env = create_jinja_environment(self.template_loader,
+                                       compiled_templates)
+        self._jinja_environment = compiled_templates, env
+        return env
+
+    def compile_templates(self, target, zip='deflated'):
+        """Precompile templates of :attr:`template_loader` into ``target``.
+        See also :func:`dodotable.util.compile_templates`.
+
+        """
+        compile_templates(target, self.template_loader, zip=zip)
+
+    def render(self, template_name, **kwargs):
+        """Render the given template with this environment."""
+        return render(template_name,
+                      extra_environments=self.__dict__(),
+                      jinja_environment=self.get_jinja_environment(),
+                      **kwargs)
+
     def get_translations(self):
         if self.get_locale is None:
             return None
@@ -86,30 +268,50 @@ class Environment(object):
             locales = [locale, locale[:locale.index('_')]]
         else:
             locales = [locale]
-        return gettext.translation(
+        key = tuple(locales)
+        try:
+            return self._translations[key]
+        except AttributeError:
+            self._translations = {}
+        except KeyError:
+            pass
+        options = {'codeset': 'utf-8'} if PY2 else {}
+        translations = gettext.translation(
             'dodotable',
             os.path.join(os.path.dirname(__file__), '..', 'locale'),
             fallback=True,
-            codeset='utf-8',
-            languages=locales
+            languages=locales,
+            **options
         )
+        self._translations[key] = translations
+        return translations
 
     def isinstance(self, instance, cls):
         if not isinstance(cls, type):
             try:
-                name = cls.split(':')
-                _mod = __import__(name[0], globals(), locals(), [name[1]], 0)
-                mod = getattr(_mod, name[1])
-            except (ImportError, IndexError):
-                return False
+                mod = _resolved_types[cls]
+            except KeyError:
+                try:
+                    name = cls.split(':')
+                    _mod = __import__(name[0], globals(), locals(),
+                                      [name[1]], 0)
+                    mod = getattr(_mod, name[1])
+                except (ImportError, IndexError):
+                    return False
+                _resolved_types[cls] = mod
         else:
             mod = cls
         return isinstance(instance, mod)
 
     def __dict__(self):
-        env = {}
-        for attribute in dir(self):
-            if not (attribute.startswith('__') or
-                    attribute in self.__env_methods__):
-                env.update({attribute: getattr(self, attribute)})
-        return env
+        # :func:`dir()` is slow, so names are listed once per class,
+        # but their values are got every time.
+        cls = type(self)
+        try:
+            names = _global_names[cls]
+        except KeyError:
+            names = [attribute for attribute in dir(self)
+                     if not (attribute.startswith('__') or
+                             attribute in self.__env_methods__)]
+            _global_names[cls] = names
+        return dict((name, getattr(self, name)) for name in names)
@@ -64,7 +64,9 @@ one of environment class, and use it in your table.
 """
 from __future__ import absolute_import
 
-from flask import request
+from flask import (copy_current_request_context, current_app, g,
+				   has_app_context, has_request_context, make_response,
+				   request)
 
 from . import Environment
 
@@ -75,6 +77,10 @@ __all__ = 'FlaskEnvironment', 'default_locale_selector'
 class FlaskEnvironment(Environment):
 		"""Build table with :mod:`flask`"""
 
+		__env_methods__ = Environment.__env_methods__ + (
+				'conditional_response', 'init_app',
+		)
+
 		def __init__(self, locale_selector=None, *args, **kwargs):
 				if locale_selector is None:
 						locale_selector = default_locale_selector
@@ -105,6 +111,103 @@ class FlaskEnvironment(Environment):
 				else:
 						return session
 
+		def init_app(self, app):
+				"""Close the read session at the end of every request of
+				the ``app``.
+
+				:param app: a Flask application
+				:type app: :class:`flask.Flask`
+
+				"""
+				app.teardown_appcontext(
+						lambda exception: self.close_read_session()
+				)
+
+		def get_read_session(self):
+				if self._read_session_factory is None or \
+				   not has_app_context():
+						return super(FlaskEnvironment, self).get_read_session()
+				try:
+						return g._dodotable_read_session
+				except AttributeError:
+						session = self._read_session_factory()
+						g._dodotable_read_session = session
+						return session
+
+		def close_read_session(self):
+				if not has_app_context():
+						return super(FlaskEnvironment, self).close_read_session()
+				session = g.pop('_dodotable_read_session', None)
+				if session is not None:
+						session.close()
+
+		def conditional_response(self, table, render, offset=0, limit=10,
+								 salt=None):
+				"""Answer ``304 Not Modified`` if the request has the page
+				already (its ``If-None-Match`` has :meth:`Table.etag()
+				<dodotable.schema.Table.etag>`), without selecting rows or
+				rendering templates.  Otherwise select the page and render
+				it.  Either response has the entity tag.
+
+				.. code-block:: python
+
+				   @app.route('/musics/')
+				   def list_musics():
+					   table = Table(cls=Music, label='music', columns=[...])
+					   return environment.conditional_response(
+						   table,
+						   lambda t: render_template('musics.html', table=t),
+						   offset, limit
+					   )
+
+				:param table: the table of the page
+				:type table: :class:`~dodotable.schema.Table`
+				:param render: a function which renders the selected table
+							   to a response (or its body)
+				:param int offset: the offset of the page
+				:param int limit: the size of the page
+				:param salt: see :meth:`~dodotable.schema.Table.etag`
+				:rtype: :class:`flask.Response`
+
+				"""
+				etag = table.etag(offset, limit, salt=salt)
+				# Compared weakly, so the tag weakened on the way (e.g. by
+				# compressing proxies) matches as well.
+				if request.if_none_match.contains_weak(etag):
+						response = current_app.response_class(status=304)
+				else:
+						response = make_response(
+								render(table.select(offset, limit))
+						)
+				response.set_etag(etag)
+				return response
+
+		def copy_context(self, function):
+				"""Make ``function`` run in a copy of the current request
+				context (see :func:`flask.copy_current_request_context`), or
+				in the current application context outside requests.
+
+				"""
+				if has_request_context():
+						return copy_current_request_context(function)
+				elif has_app_context():
+						app = current_app._get_current_object()
+
+						def call(*args, **kwargs):
+								with app.app_context():
+										return function(*args, **kwargs)
+						return call
+				return super(FlaskEnvironment, self).copy_context(function)
+
+		def get_url_cache(self):
+				if not has_app_context():
+						return None
+				try:
+						return g._dodotable_url_cache
+				except AttributeError:
+						cache = g._dodotable_url_cache = {}
+						return cache
+
 
 def default_locale_selector():
 		# FIXME
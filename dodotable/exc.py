@@ -3,8 +3,60 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 """
-__all__ = 'BadChoice',
+__all__ = (
+    'BadChoice', 'BadCursor', 'BadRange', 'QueryBudgetExceeded',
+    'SingleFlightTimeout', 'UnindexedOrderWarning',
+)
 
 
 class BadChoice(Exception):
     """Occurs when you choose an unexpected choice."""
+
+
+class BadCursor(ValueError):
+    """Occurs when a keyset cursor is malformed."""
+
+
+class BadRange(ValueError):
+    """Occurs when a bound or a preset of a range filter is malformed."""
+
+
+class QueryBudgetExceeded(Exception):
+    """Occurs when more SQL statements are issued than
+    :class:`~dodotable.counter.QueryCounter` allows.
+
+    :param budget: the allowed number of statements
+    :param statements: the issued statements
+    :type statements: :class:`list`
+
+    """
+
+    def __init__(self, budget, statements):
+        super(QueryBudgetExceeded, self).__init__(
+            '{0} statements were issued, but the budget is {1}:\n{2}'.format(
+                len(statements), budget, '\n'.join(statements)
+            )
+        )
+        self.budget = budget
+        self.statements = statements
+
+
+class SingleFlightTimeout(Exception):
+    """Occurs when a call waits for an identical in-flight call of
+    :class:`~dodotable.singleflight.SingleFlight` longer than its timeout.
+
+    :param key: the key of the call
+    :param timeout: seconds it waited
+
+    """
+
+    def __init__(self, key, timeout):
+        super(SingleFlightTimeout, self).__init__(
+            'waited for {0!r} longer than {1} seconds'.format(key, timeout)
+        )
+        self.key = key
+        self.timeout = timeout
+
+
+class UnindexedOrderWarning(UserWarning):
+    """Warned when a table is sorted by a column which no index supports."""
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.fragment` --- cache of rendered rows
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Most rows of a page are the same as the last time it was rendered.  A
+:class:`RowFragmentCache` given to :class:`~dodotable.schema.Table` keeps
+rendered rows by the table, the primary key and the version of the row and
+the locale.  The table selects only primary keys and versions of the page
+first, then loads and renders only rows which aren't cached.
+
+.. code-block:: python
+
+   row_cache = RowFragmentCache(maxsize=10000)
+
+   @app.route('/musics/')
+   def list_musics():
+       table = Table(cls=Music, label='music', columns=[...],
+                     version_attr='updated_at', row_cache=row_cache)
+       return render_template('musics.html',
+                              table=table.select(offset, limit))
+
+Rows are cached only if the table has a ``version_attr`` (or the mapper's
+``version_id_col``) and a single-column primary key.  A row is rendered
+from its own columns only, so columns which render differently for each
+request (e.g. links carrying request arguments) shouldn't be used with it.
+Functions of columns (e.g. ``_repr``) are a part of keys, so define them
+once rather than for every request to share rows between requests.
+
+"""
+import collections
+
+from .cache import LRUCache
+
+
+__all__ = 'CachedRow', 'Fragment', 'RowFragmentCache'
+
+
+#: A rendered row: its ``html`` and its ``json`` serialization.
+Fragment = collections.namedtuple('Fragment', ['html', 'json'])
+
+
+class CachedRow(object):
+    """A row of a table selected with a :class:`RowFragmentCache`.  If it
+    was cached it has only the rendered :attr:`fragment`, otherwise the
+    built :attr:`row` is rendered and cached when it's rendered first.
+
+    """
+
+    __slots__ = 'cache', 'key', 'fragment', 'row'
+
+    def __init__(self, cache, key, fragment=None, row=None):
+        self.cache = cache
+        self.key = key
+        #: (:class:`Fragment`) the rendered row.
+        self.fragment = fragment
+        #: (:class:`~dodotable.schema.Row`) the built row if it wasn't
+        #: cached.
+        self.row = row
+
+    def _render(self):
+        if self.fragment is None:
+            self.fragment = self.cache.store(self.key, self.row)
+        return self.fragment
+
+    def __html__(self):
+        return self._render().html
+
+    def __json__(self):
+        return self._render().json
+
+
+class RowFragmentCache(object):
+    """A bounded cache of rendered rows shared by requests.
+
+    :param int maxsize: the maximum number of rows
+    :param ttl: seconds a row lives.  :const:`None` means forever
+    :type ttl: :class:`numbers.Real`
+
+    """
+
+    def __init__(self, maxsize=4096, ttl=None):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def table_key(table):
+        """Make the part of keys telling how rows of the table are
+        rendered: the table, the definitions of its columns (see
+        :attr:`Column.definition_key
+        <dodotable.schema.Column.definition_key>`), the environment and
+        the locale.
+
+        """
+        environment = table.environment
+        get_locale = getattr(environment, 'get_locale', None)
+        locale = get_locale() if get_locale is not None else None
+        return (
+            type(table),
+            table.label,
+            tuple(c.definition_key for c in table.columns),
+            environment,
+            None if locale is None else str(locale),
+        )
+
+    def get_many(self, keys):
+        """Get rendered rows of ``keys``.
+
+        :return: :class:`Fragment` of each key, or :const:`None` if it
+                 isn't cached
+        :rtype: :class:`list`
+
+        """
+        return [self.cache.get(key) for key in keys]
+
+    def store(self, key, row):
+        """Render the row and cache it.
+
+        :param key: the key of the row
+        :param row: the row
+        :type row: :class:`~dodotable.schema.Row`
+        :rtype: :class:`Fragment`
+
+        """
+        fragment = Fragment(row.__html__(), row.__json__())
+        self.cache.set(key, fragment)
+        return fragment
+
+    def clear(self):
+        self.cache.clear()
+
+    def __len__(self):
+        return len(self.cache)
@@ -46,12 +46,11 @@ class Category(_Helper, SelectFilter):
 
 
 def monkey_patch_environment(environ):
-    modules = 'dodotable.schema', 'dodotable.condition', 'dodotable.helper'
-    e = environ()
-    for module_name in modules:
-        module = __import__(module_name, globals(), locals(), ['*'], -1)
-        for attr in dir(module):
-            try:
-                getattr(module, attr).environment = e
-            except AttributeError:
-                continue
+    """Replace the default environment of every schema (tables, columns,
+    filters, etc.) with an instance of ``environ``.
+
+    :param environ: an environment class
+    :type environ: :class:`type`
+
+    """
+    Schema.environment = environ()
@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.memory` --- in-memory data source
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Show records already held in memory (cached API results, registries, etc.)
+without copying them into a database.  A :class:`MemorySource` takes the
+place of a mapped class: its attributes build conditions like columns of
+a mapped class do, so :class:`~dodotable.schema.Column`,
+:class:`~dodotable.condition.Order`,
+:class:`~dodotable.condition.SelectFilter` and
+:class:`~dodotable.condition.Ilike` work as they are.
+
+.. code-block:: python
+
+   Package = collections.namedtuple('Package', ['name', 'license'])
+   packages = MemorySource(load_packages(), name='Package')
+
+   table = Table(cls=packages, label='package', columns=[
+       Column(attr='name', label='name', order_by=request.args.get('order_by'),
+              filters=[Ilike(packages, 'name', request.args)]),
+       Column(attr='license', label='license'),
+   ])
+   table.add_filter(SelectFilter(packages, 'license', licenses,
+                                 request.args))
+
+Each sortable attribute gets a sorted index on its first use, which
+equality, range and null conditions are looked up from by bisection and
+pages are sliced from.  Lowercase search keys of ``ILIKE`` conditions are
+computed once as well.  So records must not change after the source is
+made; make a new source instead.
+
+"""
+import bisect
+import itertools
+import re
+import threading
+
+import six
+from six import text_type
+
+from .cache import LRUCache
+from .util import _get_data, shallow_copy
+
+
+__all__ = (
+    'AllOf', 'AnyOf', 'Compare', 'In', 'IsNull', 'Like', 'MemoryAttribute',
+    'MemoryQuery', 'MemorySource', 'Predicate', 'all_of', 'any_of',
+)
+
+
+class Predicate(object):
+    """A condition on records of a :class:`MemorySource`."""
+
+    def positions(self, source):
+        """Find records matching the condition.
+
+        :param source: the source of records
+        :type source: :class:`MemorySource`
+        :return: positions of matching records
+        :rtype: :class:`set`
+
+        """
+        raise NotImplementedError()
+
+    def __and__(self, other):
+        return all_of(self, other)
+
+    def __or__(self, other):
+        return any_of(self, other)
+
+
+class Compare(Predicate):
+    """Compare an attribute with a value by one of :attr:`OPERATORS`.
+    Records whose attribute is :const:`None` never match, as in SQL.
+
+    """
+
+    #: (:class:`frozenset`) Supported operators.
+    OPERATORS = frozenset(['eq', 'ne', 'lt', 'le', 'gt', 'ge'])
+
+    def __init__(self, attribute_name, operator, value):
+        if operator not in self.OPERATORS:
+            raise ValueError('unsupported operator: {!r}'.format(operator))
+        self.attribute_name = attribute_name
+        self.operator = operator
+        self.value = value
+
+    def positions(self, source):
+        if self.value is None:
+            # Comparisons with NULL are never true in SQL.
+            return set()
+        index = source.index(self.attribute_name)
+        if self.operator == 'ne':
+            nulls = index.null_positions()
+            equals = index.range(self.value, self.value)
+            return set(range(len(source))) - nulls - equals
+        low = high = None
+        low_inclusive = high_inclusive = True
+        if self.operator in ('eq', 'ge', 'gt'):
+            low = self.value
+            low_inclusive = self.operator != 'gt'
+        if self.operator in ('eq', 'le', 'lt'):
+            high = self.value
+            high_inclusive = self.operator != 'lt'
+        return index.range(low, high, low_inclusive, high_inclusive)
+
+
+class In(Predicate):
+    """Match records whose attribute is one of the values."""
+
+    def __init__(self, attribute_name, values):
+        self.attribute_name = attribute_name
+        self.values = list(values)
+
+    def positions(self, source):
+        index = source.index(self.attribute_name)
+        positions = set()
+        for value in self.values:
+            if value is not None:
+                positions |= index.range(value, value)
+        return positions
+
+
+class IsNull(Predicate):
+    """Match records whose attribute is (or, unless ``null``, isn't)
+    :const:`None`.
+
+    """
+
+    def __init__(self, attribute_name, null=True):
+        self.attribute_name = attribute_name
+        self.null = null
+
+    def positions(self, source):
+        index = source.index(self.attribute_name)
+        if self.null:
+            return index.null_positions()
+        return index.range(None, None)
+
+
+class Like(Predicate):
+    """Match an attribute by a SQL ``LIKE`` pattern, where ``%`` matches
+    any string and ``_`` matches any character.
+
+    :param str pattern: the pattern
+    :param bool case_sensitive: :const:`False` for ``ILIKE``
+
+    """
+
+    def __init__(self, attribute_name, pattern, case_sensitive=True):
+        self.attribute_name = attribute_name
+        self.pattern = pattern
+        self.case_sensitive = case_sensitive
+
+    def positions(self, source):
+        pattern = text_type(self.pattern)
+        if self.case_sensitive:
+            keys = source.search_keys(self.attribute_name, lower=False)
+        else:
+            keys = source.search_keys(self.attribute_name)
+            pattern = pattern.lower()
+        inner = pattern[1:-1]
+        if (len(pattern) >= 2 and pattern[0] == pattern[-1] == '%' and
+                '%' not in inner and '_' not in inner):
+            return set(i for i, key in enumerate(keys)
+                       if key is not None and inner in key)
+        regex = re.compile(
+            ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c)
+                    for c in pattern) + r'\Z',
+            re.DOTALL
+        )
+        return set(i for i, key in enumerate(keys)
+                   if key is not None and regex.match(key))
+
+
+class AllOf(Predicate):
+    """Match records which match every predicate."""
+
+    def __init__(self, predicates):
+        self.predicates = list(predicates)
+
+    def positions(self, source):
+        positions = None
+        for predicate in self.predicates:
+            matched = _positions(predicate, source)
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                break
+        if positions is None:
+            return set(range(len(source)))
+        return positions
+
+
+class AnyOf(Predicate):
+    """Match records which match any of the predicates."""
+
+    def __init__(self, predicates):
+        self.predicates = list(predicates)
+
+    def positions(self, source):
+        positions = set()
+        for predicate in self.predicates:
+            positions |= _positions(predicate, source)
+        return positions
+
+
+def all_of(*predicates):
+    """Combine predicates by AND, like :func:`sqlalchemy.sql.and_`."""
+    return AllOf(predicates)
+
+
+def any_of(*predicates):
+    """Combine predicates by OR, like :func:`sqlalchemy.sql.or_`."""
+    return AnyOf(predicates)
+
+
+def _positions(predicate, source):
+    if isinstance(predicate, Predicate):
+        return predicate.positions(source)
+    # Filters answer ``false()`` for words they can't take,
+    # e.g. :class:`~dodotable.condition.Equal`.
+    if getattr(predicate, '__visit_name__', None) == 'false':
+        return set()
+    elif getattr(predicate, '__visit_name__', None) == 'true':
+        return set(range(len(source)))
+    raise TypeError('{!r} is not a condition on records in memory'.format(
+        predicate
+    ))
+
+
+class MemoryAttribute(object):
+    """An attribute of records of a :class:`MemorySource`, which builds
+    conditions by the operators of SQLAlchemy's column attributes.
+
+    """
+
+    def __init__(self, source, name):
+        self.source = source
+        self.name = name
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return MemoryAttribute(self.source, '{}.{}'.format(self.name, name))
+
+    def __eq__(self, value):
+        if value is None:
+            return IsNull(self.name)
+        return Compare(self.name, 'eq', value)
+
+    def __ne__(self, value):
+        if value is None:
+            return IsNull(self.name, null=False)
+        return Compare(self.name, 'ne', value)
+
+    def __lt__(self, value):
+        return Compare(self.name, 'lt', value)
+
+    def __le__(self, value):
+        return Compare(self.name, 'le', value)
+
+    def __gt__(self, value):
+        return Compare(self.name, 'gt', value)
+
+    def __ge__(self, value):
+        return Compare(self.name, 'ge', value)
+
+    def __hash__(self):
+        return hash((id(self.source), self.name))
+
+    def in_(self, values):
+        return In(self.name, values)
+
+    def is_(self, null):
+        return IsNull(self.name)
+
+    def isnot(self, null):
+        return IsNull(self.name, null=False)
+
+    def like(self, pattern):
+        return Like(self.name, pattern)
+
+    def ilike(self, pattern):
+        return Like(self.name, pattern, case_sensitive=False)
+
+    def __repr__(self):
+        return '<{0.__class__.__name__} {0.source.__name__}.{0.name}>'.format(
+            self
+        )
+
+
+class SortedIndex(object):
+    """Positions of records sorted by an attribute.  Records whose
+    attribute is :const:`None` come first.
+
+    """
+
+    def __init__(self, values):
+        nulls = [i for i, v in enumerate(values) if v is None]
+        others = sorted((i for i, v in enumerate(values) if v is not None),
+                        key=values.__getitem__)
+        #: (:class:`list`) positions of records in order.
+        self.order = nulls + others
+        self.null_count = len(nulls)
+        #: (:class:`list`) sorted values, which aren't :const:`None`.
+        self.keys = [values[i] for i in others]
+        self._ranks = None
+
+    def null_positions(self):
+        return set(self.order[:self.null_count])
+
+    def range(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True):
+        """Find records whose value is between ``low`` and ``high``
+        by bisection.  :const:`None` means unbounded.
+
+        :rtype: :class:`set`
+
+        """
+        if low is None:
+            start = 0
+        elif low_inclusive:
+            start = bisect.bisect_left(self.keys, low)
+        else:
+            start = bisect.bisect_right(self.keys, low)
+        if high is None:
+            stop = len(self.keys)
+        elif high_inclusive:
+            stop = bisect.bisect_right(self.keys, high)
+        else:
+            stop = bisect.bisect_left(self.keys, high)
+        offset = self.null_count
+        return set(self.order[offset + start:offset + stop])
+
+    @property
+    def ranks(self):
+        """(:class:`list`) Dense ranks of records by their position, so
+        equal values have the same rank.
+
+        """
+        if self._ranks is None:
+            ranks = [0] * len(self.order)
+            rank = 0
+            previous = None
+            for i, position in enumerate(self.order):
+                if i >= self.null_count:
+                    key = self.keys[i - self.null_count]
+                    if i == self.null_count or key != previous:
+                        rank += 1
+                    previous = key
+                ranks[position] = rank
+            self._ranks = ranks
+        return self._ranks
+
+
+class MemorySource(object):
+    """Records held in memory which :class:`~dodotable.schema.Table`
+    shows in place of a mapped class.
+
+    :param records: records whose attributes columns show, e.g. named tuples
+    :type records: :class:`~collections.abc.Sequence`
+    :param str name: the name of records, which names search arguments
+                     like a class name.  the class name of the first record
+                     by default
+    :param int max_orderings: the maximum number of cached orders sorted by
+                              several attributes
+
+    """
+
+    #: (:class:`str`) The name of the attribute of the positions of records,
+    #: which :class:`~dodotable.schema.Table` sorts ties by, so keyset
+    #: cursors tell tied records apart.
+    POSITION = '#position'
+
+    def __init__(self, records, name=None, max_orderings=16):
+        self._records = list(records)
+        self._positions = None
+        if name is None:
+            name = (type(self._records[0]).__name__ if self._records
+                    else 'Record')
+        self.__name__ = name
+        self._indexes = {}
+        self._search_keys = {}
+        self._orderings = LRUCache(maxsize=max_orderings)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return MemoryAttribute(self, name)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, position):
+        return self._records[position]
+
+    def query(self):
+        """Make a query of every record.
+
+        :rtype: :class:`MemoryQuery`
+
+        """
+        return MemoryQuery(self)
+
+    def values(self, attribute_name):
+        if attribute_name == self.POSITION:
+            return list(range(len(self._records)))
+        return [_get_data(record, attribute_name, None)
+                for record in self._records]
+
+    def position(self, record):
+        """Get the position of the record, i.e. its :attr:`POSITION`.
+
+        :raise KeyError: if the record isn't of the source
+
+        """
+        positions = self._positions
+        if positions is None:
+            positions = dict((id(r), i) for i, r
+                             in reversed(list(enumerate(self._records))))
+            self._positions = positions
+        return positions[id(record)]
+
+    def index(self, attribute_name):
+        """Get the sorted index of the attribute.  It's built on the first
+        use.
+
+        :rtype: :class:`SortedIndex`
+
+        """
+        try:
+            return self._indexes[attribute_name]
+        except KeyError:
+            with self._lock:
+                if attribute_name not in self._indexes:
+                    self._indexes[attribute_name] = SortedIndex(
+                        self.values(attribute_name)
+                    )
+                return self._indexes[attribute_name]
+
+    def search_keys(self, attribute_name, lower=True):
+        """Get the attribute of records as strings to search, lowercased
+        unless ``lower`` is :const:`False`.  They're computed on the
+        first use.
+
+        :rtype: :class:`list`
+
+        """
+        key = attribute_name, lower
+        try:
+            return self._search_keys[key]
+        except KeyError:
+            keys = []
+            for value in self.values(attribute_name):
+                if value is not None:
+                    value = text_type(value)
+                    if lower:
+                        value = value.lower()
+                keys.append(value)
+            self._search_keys[key] = keys
+            return keys
+
+    def ordering(self, orders):
+        """Get positions of records sorted by the criteria.  Ties are in
+        the order of records.  Orders are cached.
+
+        :param orders: pairs of an attribute name and whether it's
+                       descending
+        :rtype: :class:`list`
+
+        """
+        orders = tuple(orders)
+        if len(orders) == 1 and not orders[0][1]:
+            return self.index(orders[0][0]).order
+        ordering = self._orderings.get(orders)
+        if ordering is None:
+            ordering = self.sort(range(len(self)), orders)
+            self._orderings.set(orders, ordering)
+        return ordering
+
+    def sort(self, positions, orders):
+        """Sort positions of records by the criteria.  Ties are in the
+        order of records.
+
+        :param positions: positions of records in ascending order
+        :param orders: pairs of an attribute name and whether it's
+                       descending
+        :rtype: :class:`list`
+
+        """
+        positions = list(positions)
+        # Sorts are stable (even reversed ones), so sorting by each
+        # criterion from the last one sorts by all of them.
+        for name, descending in reversed(orders):
+            positions.sort(key=self.index(name).ranks.__getitem__,
+                           reverse=descending)
+        return positions
+
+
+class MemoryQuery(object):
+    """A query of records of a :class:`MemorySource`, which answers the
+    methods of :class:`~sqlalchemy.orm.query.Query` that
+    :class:`~dodotable.schema.Table` calls.
+
+    """
+
+    #: Sort selected records directly rather than walking an index when
+    #: fewer than ``1 / SORT_RATIO`` of records are selected.
+    SORT_RATIO = 8
+
+    def __init__(self, source):
+        self.source = source
+        self._filters = []
+        self._orders = []
+        self._offset = 0
+        self._limit = None
+
+    def _copy(self):
+        query = shallow_copy(self)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        return query
+
+    def filter(self, *predicates):
+        query = self._copy()
+        query._filters.extend(predicates)
+        return query
+
+    def order_by(self, *orders):
+        """Sort records by :class:`~dodotable.condition.Order` objects.
+        ``order_by(None)`` cancels sort criteria.
+
+        """
+        from .condition import Order
+        query = self._copy()
+        if orders == (None,):
+            query._orders = []
+        else:
+            query._orders.extend(
+                (o.attribute_name, o.order == Order.DESCENDANT)
+                for o in orders
+            )
+            # Ties are in the order of records already.
+            tiebreaker = self.source.POSITION, False
+            while query._orders and query._orders[-1] == tiebreaker:
+                query._orders.pop()
+        return query
+
+    def offset(self, offset):
+        query = self._copy()
+        query._offset = int(offset or 0)
+        return query
+
+    def limit(self, limit):
+        query = self._copy()
+        query._limit = None if limit is None else int(limit)
+        return query
+
+    def yield_per(self, count):
+        return self
+
+    def selected(self):
+        """Positions of records matching filters, or :const:`None` if
+        every record matches.
+
+        """
+        if not self._filters:
+            return None
+        return AllOf(self._filters).positions(self.source)
+
+    def count(self):
+        selected = self.selected()
+        return len(self.source) if selected is None else len(selected)
+
+    def count_groups(self, attribute_name):
+        """Count records of each value of the attribute.
+
+        :return: pairs of a value and its number of records
+        :rtype: :class:`list`
+
+        """
+        index = self.source.index(attribute_name)
+        selected = self.selected()
+        groups = []
+        if index.null_count:
+            nulls = index.order[:index.null_count]
+            if selected is not None:
+                nulls = [p for p in nulls if p in selected]
+            if nulls:
+                groups.append((None, len(nulls)))
+        offset = index.null_count
+        for value, positions in itertools.groupby(
+                enumerate(index.order[offset:]),
+                lambda pair: index.keys[pair[0]]):
+            if selected is None:
+                count = sum(1 for _ in positions)
+            else:
+                count = sum(1 for _, p in positions if p in selected)
+            if count:
+                groups.append((value, count))
+        return groups
+
+    def _ordered_positions(self):
+        """Positions of selected records in order, or :const:`None` if
+        every record is selected in the order of records.
+
+        """
+        selected = self.selected()
+        if not self._orders:
+            return None if selected is None else sorted(selected)
+        if (selected is not None and
+                len(selected) * self.SORT_RATIO < len(self.source)):
+            return self.source.sort(sorted(selected), self._orders)
+        ordering = self.source.ordering(self._orders)
+        if selected is None:
+            return ordering
+        return (p for p in ordering if p in selected)
+
+    def __iter__(self):
+        positions = self._ordered_positions()
+        start = self._offset
+        stop = None if self._limit is None else start + self._limit
+        if positions is None:
+            if stop is None or stop > len(self.source):
+                stop = len(self.source)
+            positions = six.moves.range(start, stop)
+        elif isinstance(positions, list):
+            positions = positions[start:stop]
+        else:
+            positions = itertools.islice(positions, start, stop)
+        records = self.source
+        for position in positions:
+            yield records[position]
+
+    def all(self):
+        return list(self)
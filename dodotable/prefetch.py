@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.prefetch` --- background prefetch of the next page
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+People walk through pages one after another.  A :class:`Prefetcher` given
+to :class:`~dodotable.schema.Table` fetches page N+1 in a background thread
+after page N is served, so the next request is a cache hit.
+
+.. code-block:: python
+
+   prefetcher = Prefetcher(maxsize=32, ttl=30)
+
+   @app.route('/musics/')
+   def list_musics():
+       table = Table(cls=Music, label='music', columns=[...],
+                     prefetcher=prefetcher)
+       return render_template('musics.html',
+                              table=table.select(offset, limit))
+
+Prefetched rows are loaded on their own session which is closed
+afterward, so their instances are detached: columns which load lazy
+relationships while rendering shouldn't be used with prefetching.
+
+"""
+import collections
+import copy
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from .cache import LRUCache
+from .util import query_key
+
+
+__all__ = 'PrefetchedPage', 'Prefetcher'
+
+
+#: A prefetched page.
+PrefetchedPage = collections.namedtuple(
+    'PrefetchedPage', ['rows', 'count', 'version', 'next_cursor']
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher(object):
+    """Fetch pages in background threads into a short-lived cache keyed by
+    the filter and order state of the table.
+
+    :param int maxsize: the maximum number of cached pages
+    :param ttl: seconds a prefetched page lives
+    :type ttl: :class:`numbers.Real`
+    :param int max_workers: the maximum number of concurrent prefetches.
+                            pages aren't prefetched when every worker is
+                            busy
+    :param session_factory: a function which takes a table and returns
+                            a new session for it.  a session bound to
+                            the same engine of the table's read session
+                            by default
+
+    """
+
+    def __init__(self, maxsize=32, ttl=30, max_workers=2,
+                 session_factory=None):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        if session_factory is None:
+            session_factory = self.create_session
+        self.session_factory = session_factory
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def create_session(table):
+        return Session(bind=table.session_for('select').get_bind())
+
+    @staticmethod
+    def key(table, offset, limit):
+        """Make the cache key of a page of the table: its query, the page
+        and the definitions of its columns, which rows are built by.
+
+        """
+        return (query_key(table.query), int(offset), int(limit),
+                tuple(c.definition_key for c in table.columns))
+
+    def take(self, key, timeout=None):
+        """Take the prefetched page of ``key`` out of the cache.  If it's
+        being fetched, wait for it.
+
+        :param key: a key made by :meth:`key`
+        :param timeout: seconds to wait for an in-flight prefetch
+        :return: the page or :const:`None`
+        :rtype: :class:`PrefetchedPage`
+
+        """
+        with self._lock:
+            event = self._in_flight.get(key)
+        if event is not None:
+            event.wait(timeout)
+        return self.cache.pop(key)
+
+    def prefetch(self, table, offset, limit):
+        """Fetch the page of the table in a background thread.
+
+        :return: whether it's scheduled
+        :rtype: :class:`bool`
+
+        """
+        key = self.key(table, offset, limit)
+        with self._lock:
+            if key in self._in_flight or key in self.cache:
+                return False
+            if not self._workers.acquire(False):
+                return False
+            event = self._in_flight[key] = threading.Event()
+        table = copy.copy(table)
+        table.prefetcher = None
+        # Routing may depend on the request, so resolve it here.
+        table.read_session = table.session_for('select')
+        thread = threading.Thread(target=self._fetch,
+                                  args=(table, key, offset, limit, event))
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def _fetch(self, table, key, offset, limit, event):
+        try:
+            session = self.session_factory(table)
+            try:
+                table.session = table.read_session = session
+                table.select(offset=offset, limit=limit, since=table.since)
+                page = PrefetchedPage(rows=table.rows,
+                                      count=table.pager.count,
+                                      version=table.version,
+                                      next_cursor=table.next_cursor)
+            finally:
+                session.close()
+            self.cache.set(key, page)
+        except Exception:
+            logger.exception('failed to prefetch %r', key)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+            self._workers.release()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.routing` --- session routing
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Pages and counts of a table are the heaviest queries of a listing, and
+they only read.  An environment which gives a read session (e.g. bound to
+a read replica) lets tables run them there, while everything else stays on
+the default session:
+
+.. code-block:: python
+
+   replica = sessionmaker(bind=create_engine(REPLICA_URL))
+
+   class MyEnvironment(FlaskEnvironment):
+       pass
+
+   Schema.environment = MyEnvironment(read_session_factory=replica)
+
+Which session an operation runs on is decided by a routing policy, so
+e.g. tables right after a write can keep reading from the primary.
+
+"""
+__all__ = (
+    'DEFAULT', 'PrimaryOnlyPolicy', 'READ', 'READ_OPERATIONS',
+    'RoutingPolicy',
+)
+
+
+#: (:class:`str`) Route to the default session of the table.
+DEFAULT = 'default'
+
+#: (:class:`str`) Route to the read session of the environment.
+READ = 'read'
+
+#: (:class:`frozenset`) Operations of :class:`~dodotable.schema.Table`
+#: which only read: ``'select'`` (pages and exports of
+#: :attr:`~dodotable.schema.Table.query`), ``'count'`` and ``'facets'``,
+#: and ``'choices'`` of
+#: :class:`~dodotable.condition.DistinctSelectFilter`, which is routed
+#: with no table.
+READ_OPERATIONS = frozenset(['select', 'count', 'facets', 'choices'])
+
+
+class RoutingPolicy(object):
+    """Route read operations to the read session and the others to the
+    default session.  Override :meth:`route` for other policies.
+
+    """
+
+    def route(self, table, operation):
+        """Decide the session of an operation of the table.
+
+        :param table: the table, or :const:`None` for an operation of no
+                      table
+        :type table: :class:`~dodotable.schema.Table`
+        :param str operation: the name of the operation, e.g. ``'count'``
+        :return: :const:`READ` or :const:`DEFAULT`
+        :rtype: :class:`str`
+
+        """
+        return READ if operation in READ_OPERATIONS else DEFAULT
+
+
+class PrimaryOnlyPolicy(RoutingPolicy):
+    """Route every operation to the default session, e.g. to read your
+    own writes.
+
+    """
+
+    def route(self, table, operation):
+        return DEFAULT
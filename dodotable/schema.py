@@ -6,26 +6,98 @@
 from __future__ import absolute_import
 
 import collections
+import datetime
+import hashlib
+import logging
+import threading
 try:
 	from collections.abc import MutableSequence
 except ImportError:
 	from collections import MutableSequence
 import math
+import sys
+import warnings
 
-from sqlalchemy.orm import Query
+from six import (python_2_unicode_compatible, reraise, string_types,
+				 text_type)
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, Session
 
-from .environment.flask import FlaskEnvironment
-from .util import render, string_literal, _get_data
-
-from pprint import pprint
+from .exc import BadCursor, UnindexedOrderWarning
+from .memory import MemorySource
+from .util import (DATETIME_FORMAT, JSON_TYPES, count_rows, decode_cursor,
+				   encode_cursor, identity_key, query_key, shallow_copy,
+				   string_literal, _get_data)
 
 __all__ = (
 	'Cell', 'Column', 'LinkedColumn', 'ObjectColumn', 'ENVIRONMENT',
-	'Queryable', 'Renderable', 'Row', 'Table', 'Pager', 'Schema',
+	'Preview', 'Queryable', 'Renderable', 'Row', 'StreamedRows', 'Table',
+	'TableDefinition', 'TableGroup', 'TableSnapshot', 'Pager', 'Schema',
+	'get_default_environment',
 )
 
 
-ENVIRONMENT = FlaskEnvironment()
+logger = logging.getLogger(__name__)
+
+#: (:class:`frozenset`) Names of dialects whose ``char_length()`` counts
+#: characters of a text, used instead of ``length()`` to tell whether texts
+#: of :class:`Column` which has ``preview`` are longer.  ``length()`` of
+#: MySQL counts bytes.
+CHAR_LENGTH_DIALECTS = frozenset(['mariadb', 'mysql', 'postgresql'])
+
+
+#: (:class:`~.environment.flask.FlaskEnvironment`) The default environment.
+#: It's created on first use, so importing this module doesn't import Flask.
+_default_environment = None
+
+
+def get_default_environment():
+	"""Get the default environment, :data:`ENVIRONMENT`.
+
+	:rtype: :class:`~.environment.flask.FlaskEnvironment`
+
+	"""
+	global _default_environment
+	if _default_environment is None:
+		from .environment.flask import FlaskEnvironment
+		_default_environment = FlaskEnvironment()
+	return _default_environment
+
+
+if sys.version_info >= (3, 7):
+	def __getattr__(name):
+		if name == 'ENVIRONMENT':
+			return get_default_environment()
+		raise AttributeError('module {!r} has no attribute {!r}'.format(
+			__name__, name
+		))
+else:
+	ENVIRONMENT = get_default_environment()
+
+
+def _stable_key(value):
+	"""Make ``value`` (e.g. :attr:`Column.definition_key`) representable
+	the same in every process, for entity tags: functions and classes in
+	it are replaced with their names.
+
+	"""
+	if isinstance(value, tuple):
+		return tuple(_stable_key(v) for v in value)
+	if callable(value):
+		name = getattr(value, '__qualname__', None) or \
+			getattr(value, '__name__', None) or type(value).__name__
+		return '{0}.{1}'.format(getattr(value, '__module__', None), name)
+	return value
+
+
+class DefaultEnvironment(object):
+	"""Descriptor of :attr:`Schema.environment` which returns
+	:func:`get_default_environment` unless it's overridden.
+
+	"""
+
+	def __get__(self, instance, owner):
+		return get_default_environment()
 
 
 class Schema(object):
@@ -36,12 +108,10 @@ class Schema(object):
 
 	"""
 
-	environment = ENVIRONMENT
+	environment = DefaultEnvironment()
 
 	def render(self, template_name, **kwargs):
-		return render(template_name,
-					  extra_environments=self.environment.__dict__(),
-					  **kwargs)
+		return self.environment.render(template_name, **kwargs)
 
 
 class Renderable(object):
@@ -107,26 +177,81 @@ class Cell(Schema, Renderable):
 	def __html__(self):
 		return self.render('cell.html', cell=self)
 
+	def __json__(self):
+		if self.data is None or isinstance(self.data, JSON_TYPES):
+			return self.data
+		return self.repr(self.data)
+
 
 class LinkedCell(Cell):
 	"""Cell Linked to Content
 
+	The url is computed lazily when it's rendered, so outputs which don't
+	show links don't pay for callable endpoints (e.g. :func:`flask.url_for`).
+	Urls are memoized per request in
+	:meth:`~dodotable.environment.Environment.get_url_cache` by the target's
+	identity, so repeated targets resolve once.
+
 	: param int col: column position
 	: param int row: row position
 	: param data: the data to be filled in the cell
-	: param endpoint: The url to go to when you press data
+	: param endpoint: The url to go to when you press data, or a function
+					  which takes ``target`` and returns the url
+	: param target: the argument of ``endpoint``
+	: param endpoint_key: a function which takes ``target`` and returns
+						  the key to memoize the url by.  the identity of
+						  the mapped instance by default
 
 	"""
 
-	def __init__(self, col, row, data, endpoint):
+	def __init__(self, col, row, data, endpoint, target=None,
+				 endpoint_key=None):
 		self.col = col
 		self.row = row
 		self.data = data
-		self.url = endpoint
+		self.endpoint = endpoint
+		self.target = target
+		self.endpoint_key = endpoint_key
+
+	@property
+	def url(self):
+		try:
+			return self._url
+		except AttributeError:
+			pass
+		if not callable(self.endpoint):
+			url = self.endpoint
+		else:
+			cache = self.environment.get_url_cache()
+			key = None
+			if cache is not None:
+				if self.endpoint_key is None:
+					key = identity_key(self.target)
+				else:
+					key = self.endpoint_key(self.target)
+			if key is None:
+				url = self.endpoint(self.target)
+			else:
+				key = self.endpoint, key
+				try:
+					url = cache[key]
+				except KeyError:
+					url = cache[key] = self.endpoint(self.target)
+		self._url = url
+		return url
+
+	@url.setter
+	def url(self, url):
+		self._url = url
 
 	def __html__(self):
 		return self.render('linkedcell.html', cell=self)
 
+	def __json__(self):
+		if self.data is None or isinstance(self.data, JSON_TYPES):
+			return self.data
+		return string_literal(self.data)
+
 
 class Column(Schema, Renderable):
 	"""A class representing a table column
@@ -141,29 +266,79 @@ class Column(Schema, Renderable):
 						 Even if the value is False
 						 : class: `~ dodotable.condition.IlikeSet`
 						 As it is seen, we can use for search.
+	: param int preview: if it's given, only the first ``preview``
+						 characters of the text are selected, see
+						 :class:`Preview`
 
 	"""
 
 	def __init__(self, label, attr, order_by=(), filters=None,
 				 _repr=string_literal, sortable=True, visible=True,
-				 editable=False,nullable= None ,classes=()):
-		from .condition import Order
+				 editable=False,nullable= None ,classes=(), preview=None):
+		from .condition import SortSpec
 		if filters is None:
 			filters = []
 		self.label = label
 		self.attr = attr
 		self.filters = filters
-		self.order_by = Order.of_column(attr, order_by)
+		spec = SortSpec.parse(order_by)
+		self.order_by = spec.order_of(attr)
+		#: (:class:`int`) the priority of the column in requested sort
+		#: criteria.  :const:`None` if it isn't requested
+		self.order_priority = spec.priority_of(attr)
 		self._repr = _repr
 		self.sortable = sortable
 		self.visible = visible
 		self.editable = editable
 		self.classes = classes
 		self.nullable = nullable
+		self.preview = preview
 
 	def add_filter(self, filter):
 		self.filters.append(filter)
 
+	@property
+	def definition_key(self):
+		"""(:class:`tuple`) The type and attributes of the column which
+		tell how its cells are built and rendered, to key caches of them.
+		Functions (e.g. ``_repr``) are compared by their identity, so
+		define them once rather than for every request to share caches
+		between requests.
+
+		"""
+		classes = self.classes
+		if not isinstance(classes, string_types):
+			classes = tuple(classes)
+		return (type(self), self.label, self.attr, self._repr, classes,
+				self.sortable, self.visible, self.editable, self.nullable,
+				self.preview)
+
+	def bind(self, request_args):
+		"""Make a copy of the column for a request, see
+		:class:`TableDefinition`.  The sort order is read from
+		``order_by`` of ``request_args`` if it's given, and filters which
+		take ``request_args`` are bound to them.
+
+		:param request_args:
+		:type request_args: :class:`~collections.abc.Mapping`
+		:rtype: :class:`Column`
+
+		"""
+		from .condition import SortSpec
+		column = shallow_copy(self)
+		if 'order_by' in request_args:
+			spec = SortSpec.parse(request_args['order_by'])
+			column.order_by = spec.order_of(self.attr)
+			column.order_priority = spec.priority_of(self.attr)
+		filters = []
+		for filter in self.filters:
+			if hasattr(filter, 'request_args'):
+				filter = shallow_copy(filter)
+				filter.request_args = request_args
+			filters.append(filter)
+		column.filters = filters
+		return column
+
 	def __cell__(self, col, row, data, attribute_name, default=None):
 		"""Convert the column's data to: class: `~ dodotable.Cell`.
 
@@ -182,6 +357,14 @@ class Column(Schema, Renderable):
 	def __html__(self):
 		return self.render('column.html', column=self)
 
+	def __json__(self):
+		return {
+			'label': self.label,
+			'attr': self.attr,
+			'order_by': self.order_by,
+			'sortable': self.sortable,
+		}
+
 
 class LinkedColumn(Column):
 	"""The class representing the column to which the link should go
@@ -189,20 +372,29 @@ class LinkedColumn(Column):
 	: param str label: column label
 	: param str attr: Attribute name to import
 	param str or function endpoint
+	: param function endpoint_key: Returns the key which memoizes urls of
+								   the row, see :class:`LinkedCell`
 	: param list order_by: Sort by
 
 	"""
 
 	def __init__(self, *args, **kwargs):
 		self.endpoint = kwargs.pop('endpoint')
+		self.endpoint_key = kwargs.pop('endpoint_key', None)
 		super(LinkedColumn, self).__init__(*args, **kwargs)
 
+	@property
+	def definition_key(self):
+		return super(LinkedColumn, self).definition_key + (
+			self.endpoint, self.endpoint_key,
+		)
+
 	def __cell__(self, col, row, data, attribute_name, default=None):
-		endpoint = self.endpoint(data) if callable(
-			self.endpoint) else self.endpoint
 		return LinkedCell(col=col, row=row,
 						  data=_get_data(data, attribute_name, default),
-						  endpoint=endpoint)
+						  endpoint=self.endpoint,
+						  target=data,
+						  endpoint_key=self.endpoint_key)
 
 
 class ObjectColumn(Column):
@@ -223,6 +415,62 @@ class HiddenColumn(Column):
 		self.visible = False
 
 
+@python_2_unicode_compatible
+class Preview(text_type):
+	"""The first characters of a long text of a :class:`Column` which has
+	``preview``.  The table defers loading the full text and selects only
+	its first characters and whether there are more.
+
+	:param text: the first characters
+	:param bool truncated: whether the full text is longer
+	:param record: the record of the text
+	:param str attribute_name: the attribute of the text
+	:param table: the table which selected the record.  if it's given the
+				  full text is queried by the primary key of the record on
+				  :meth:`Table.session_for('select') <Table.session_for>`,
+				  so the record may be detached (e.g. prefetched) or
+				  belong to a session of another thread
+	:type table: :class:`Table`
+
+	"""
+
+	def __new__(cls, text, truncated, record=None, attribute_name=None,
+				table=None):
+		preview = super(Preview, cls).__new__(cls, text)
+		preview.truncated = truncated
+		preview.record = record
+		preview.attribute_name = attribute_name
+		preview.table = table
+		return preview
+
+	def load(self):
+		"""Load the full text of the record."""
+		if not self.truncated:
+			return self[:]
+		if self.table is None:
+			return _get_data(self.record, self.attribute_name, None)
+		return self.table._load_attribute(self.record, self.attribute_name)
+
+	def __str__(self):
+		return self[:] + u'\u2026' if self.truncated else self[:]
+
+
+class _PreviewedRecord(object):
+	"""A record whose previewed attributes are :class:`Preview`."""
+
+	__slots__ = '_record', '_previews'
+
+	def __init__(self, record, previews):
+		self._record = record
+		self._previews = previews
+
+	def __getattr__(self, name):
+		try:
+			return self._previews[name]
+		except KeyError:
+			return getattr(self._record, name)
+
+
 class Row(Schema, MutableSequence, Renderable):
 	"""A class representing a row in a table """
 
@@ -252,6 +500,36 @@ class Row(Schema, MutableSequence, Renderable):
 	def __html__(self):
 		return self.render('row.html', row=self)
 
+	def __json__(self):
+		return [cell.__json__() for cell in self]
+
+
+class StreamedRows(object):
+	"""Rows of :class:`Table` which are built while they're iterated, see
+	``batch_size`` of :meth:`Table.select`.  They can be iterated only once.
+
+	"""
+
+	def __init__(self, rows):
+		self._rows = iter(rows)
+		self._head = []
+
+	def __bool__(self):
+		if not self._head:
+			try:
+				self._head.append(next(self._rows))
+			except StopIteration:
+				return False
+		return True
+
+	__nonzero__ = __bool__
+
+	def __iter__(self):
+		while self._head:
+			yield self._head.pop()
+		for row in self._rows:
+			yield row
+
 
 class Pager(Schema, Renderable):
 
@@ -265,7 +543,7 @@ class Pager(Schema, Renderable):
 	def __init__(self, limit, offset, count, padding=10):
 		try:
 			self.limit = int(limit)
-			self.offset = int(offset)
+			self.offset = offset if callable(offset) else int(offset)
 			self.count = int(count)
 			self.padding = int(padding)
 		except ValueError:
@@ -274,12 +552,33 @@ class Pager(Schema, Renderable):
 			self.count = 0
 			self.padding = 10
 
+	@property
+	def offset(self):
+		"""The number of rows before the page.  if a callable is given
+		instead, it's called to locate the page only when it's read first.
+
+		"""
+		if callable(self._offset):
+			self._offset = int(self._offset())
+		return self._offset
+
+	@offset.setter
+	def offset(self, offset):
+		self._offset = offset
+
 	def from_page_number(self, number):
 		return self.Page(limit=self.limit, offset=(number - 1) * self.limit,
 						 selected=False, number=number)
 
 	@property
 	def pages(self):
+		key = self.limit, self.offset, self.count, self.padding
+		memo = getattr(self, '_pages', None)
+		if memo is None or memo[0] != key:
+			memo = self._pages = key, self._build_pages()
+		return memo[1]
+
+	def _build_pages(self):
 		page_count = int(math.ceil(self.count / float(self.limit)))
 		current_page_count = (self.offset // self.limit) + 1
 		pages = []
@@ -309,25 +608,124 @@ class Pager(Schema, Renderable):
 	def __html__(self):
 		return self.render('pager.html', pager=self)
 
+	def __json__(self):
+		return {
+			'count': self.count,
+			'limit': self.limit,
+			'offset': self.offset,
+			'pages': [dict(page._asdict()) for page in self.pages],
+		}
+
+
+class TableSnapshot(object):
+	"""The state of :class:`Table` frozen by :meth:`Table.select`, so
+	templates and callers read it without recomputing.
+
+	:param columns: visible columns
+	:param orders: the order plan, :class:`~dodotable.condition.Order`
+				   objects
+	:param filters: the filter plan, SQL conditions of filters
+
+	"""
+
+	__slots__ = 'columns', 'orders', 'filters', 'count', 'pager'
+
+	def __init__(self, columns, orders, filters, count=None, pager=None):
+		self.columns = columns
+		self.orders = orders
+		self.filters = filters
+		#: (:class:`int`) the number of rows under the filters.
+		self.count = count
+		#: (:class:`Pager`) the pager of the selected page.
+		self.pager = pager
+
 
 class Table(Schema, Queryable, Renderable):
 	"""The frame of the table representing the data
 
-	:param cls:
+	:param cls: a mapped class, a query, or
+				:class:`~dodotable.memory.MemorySource` to show records
+				in memory
 	:param label:
 	:param columns:
-	:param sqlalchemy_session:
+	:param sqlalchemy_session: not needed for
+							   :class:`~dodotable.memory.MemorySource`
+	:param str version_attr: the name of an attribute which increases
+							 whenever a row changes (e.g. ``updated_at``).
+							 the mapper's ``version_id_col`` by default
+	:param prefetcher: prefetches the next page after a page is selected
+	:type prefetcher: :class:`~dodotable.prefetch.Prefetcher`
+	:param bool warn_unindexed_order: whether to warn
+		:exc:`~dodotable.exc.UnindexedOrderWarning` if no index of the
+		mapped table leads with the first sort column
+	:param read_session: a session to run read-only queries on, e.g. bound
+						 to a read replica.  the environment's
+						 :meth:`~.environment.Environment.get_read_session`
+						 by default.  see :meth:`session_for`
+	:param page_index: seeks pages from sampled page boundaries instead of
+					   skipping rows by ``OFFSET``
+	:type page_index: :class:`~dodotable.boundary.PageBoundaryIndex`
+	:param singleflight: coalesces concurrent selects and counts of the
+						 same state into one query.  only results of the
+						 query are shared, see :mod:`dodotable.singleflight`
+	:type singleflight: :class:`~dodotable.singleflight.SingleFlight`
+	:param total_counter: the cached total of ``cls``, used as
+						  :attr:`count` while no filter is applied
+	:type total_counter: :class:`~dodotable.totals.TotalCounter`
+	:param row_cache: renders only rows which aren't cached by their
+					  primary key and ``version_attr``
+	:type row_cache: :class:`~dodotable.fragment.RowFragmentCache`
 
 	"""
 
 	def __init__(self, cls, label, unit_label="row",
 				 columns=None,
-				 sqlalchemy_session=None):
+				 sqlalchemy_session=None,
+				 version_attr=None,
+				 prefetcher=None,
+				 warn_unindexed_order=False,
+				 read_session=None,
+				 page_index=None,
+				 singleflight=None,
+				 total_counter=None,
+				 row_cache=None):
 		self.cls = cls
 		self.label = label
 		self.unit_label = unit_label
 		self._filters = []
+		#: (:class:`list`) renderable :class:`~dodotable.helper.Category`
+		#: filters, shown next to the label.
+		self.categories = []
+		#: (:class:`list`) renderable :class:`~dodotable.helper.Limit`
+		#: helpers, shown under the table.
+		self.limits = []
+		#: (:class:`list`) renderable :class:`~dodotable.helper._Helper`
+		#: filters.
+		self.helpers = []
+		#: (:class:`list`) renderable filters which aren't helpers,
+		#: shown above the table.
+		self.widgets = []
 		self.rows = []
+		self.since = None
+		#: The greatest :attr:`version_attr` of selected rows.
+		self.version = None
+		#: A keyset cursor to select the next page with.
+		self.next_cursor = None
+		if version_attr is None:
+			mapper = inspect(self.entity, raiseerr=False)
+			version_col = getattr(mapper, 'version_id_col', None)
+			if version_col is not None:
+				version_attr = mapper.get_property_by_column(version_col).key
+		self.version_attr = version_attr
+		self.prefetcher = prefetcher
+		self.page_index = page_index
+		self.singleflight = singleflight
+		self.total_counter = total_counter
+		self.row_cache = row_cache
+		self.warn_unindexed_order = warn_unindexed_order
+		#: (:class:`TableSnapshot`) the state frozen by the last
+		#: :meth:`select`.  :meth:`add_filter` discards it
+		self.snapshot = None
 		if columns is None:
 			self._columns = []
 		else:
@@ -335,120 +733,914 @@ class Table(Schema, Queryable, Renderable):
 		self._count = None
 		self.session = sqlalchemy_session
 		try:
-			if sqlalchemy_session is None:
+			if sqlalchemy_session is None and not self.in_memory:
 				self.session = self.environment.get_session()
 		finally:
-			if not self.session:
+			if not (self.session or self.in_memory):
 				raise ValueError("{0.__class__.__name__}.session "
 								 "can't be None".format(self))
+		self.read_session = read_session
 		self.pager = Pager(limit=1, offset=0, count=0)
 		self.pager.environment = self.environment
 
-	def select(self, offset=Pager.DEFAULT_OFFSET, limit=Pager.DEFAULT_LIMIT):
-		self.rows = []
-		# print ("query {}".format(vars(self.query)))
-		q = self.query.offset(offset).limit(limit)
-		for i, row in enumerate(q):
-			# pprint(vars(row._sa_instance_state.class_))
-
-			# aTable = row._sa_instance_state.class_._sa_class_manager
-			aTable = row._sa_instance_state.class_.__table__
-			# pprint (vars(aTable))
-			# pprint (dir(aTable))
-			# print()
-			
-			# for c2 in aTable.columns:
-			#     # pprint (vars(c2) )
-			#     print (c2.key)
-			#     print (c2.nullable)
-			#     print (c2.primary_key)
-			#     print (c2.default)
-		   
-			_row = Row()
-			for j, col in enumerate(self.columns):
-
-				for aItem in aTable.columns:
-					bItem = col.attr.split(".")[0]		
-					# print (" {} = {} ".format(aItem.key, bItem))			
-					# if aItem.key == bItem:
-					# 	print (aItem.key)
-					# 	print (aItem.nullable)
-					# 	print (aItem.primary_key)
-					# 	print (aItem.default)
-					# 	print (col)
-					# 	pprint (vars(col))
-					# 	pprint (dir(col))
-						
-						# col.nullable = nullable
-						# col.primary_key = primary_key
-						# col['default'] = default
-
-				_row.append(
-					col.__cell__(col=j, row=i, data=row,
-								 attribute_name=col.attr)
-				)
-				
-			self.rows.append(_row)
-   
-		self.pager = Pager(limit=limit, offset=offset,
-						   count=self.count)
+	def session_for(self, operation):
+		"""Get the session an operation runs on, routed by the
+		environment's routing policy (see :mod:`dodotable.routing`).
+
+		:param str operation: e.g. ``'select'`` or ``'count'``
+		:rtype: :class:`~sqlalchemy.orm.session.Session`
+
+		"""
+		return self.environment.route_session(self, operation)
+
+	def select(self, offset=Pager.DEFAULT_OFFSET, limit=Pager.DEFAULT_LIMIT,
+			   after=None, since=None, batch_size=None):
+		"""Select a page of rows.
+
+		:param offset: the number of rows to skip
+		:param limit: the number of rows of the page
+		:param after: a keyset cursor of the previous page
+					  (:attr:`next_cursor`).  if it's given, the page starts
+					  right after the last row of the previous page
+		:param since: select only rows whose :attr:`version_attr` is greater
+					  than it, i.e. rows changed since the given version
+		:param batch_size: if it's given, rows are streamed from a server
+						   side cursor ``batch_size`` rows at a time and
+						   :attr:`rows` becomes :class:`StreamedRows`,
+						   which builds rows while they're iterated (e.g.
+						   rendered).  so memory is bounded by the batch
+						   size rather than ``limit``.  note that
+						   :attr:`version` and :attr:`next_cursor` are set
+						   after the rows are consumed, and that streaming
+						   can't eagerly load collections
+		:return: the table itself
+
+		"""
+		from .condition import Keyset
+		if since is not None:
+			since = self._parse_since(since)
+		self.since = since
+		self.snapshot = None
+		columns = self.columns
+		self.snapshot = snapshot = TableSnapshot(
+			columns=columns,
+			orders=self._orders,
+			filters=[f for f in self._filter_queries if f is not None],
+		)
+		query = self.query
+		orders = snapshot.orders
+		keyset = None
+		if after is not None:
+			keyset = Keyset(orders, decode_cursor(after),
+							nulls_first=self._nulls_first)
+			query = query.filter(keyset.__query__())
+		else:
+			boundary = None
+			if self.page_index is not None and not self.in_memory:
+				boundary = self.page_index.boundary(self, orders, offset,
+													limit)
+			if boundary is None:
+				query = query.offset(offset)
+			else:
+				query = query.filter(Keyset(
+					orders, boundary, nulls_first=self._nulls_first
+				).__query__())
+		query = self._with_previews(query.limit(limit))
+		self.version = since
+		self.next_cursor = None
+		prefetcher = self.prefetcher
+		if after is not None or batch_size is not None:
+			prefetcher = None
+		page = None
+		if prefetcher is not None:
+			page = prefetcher.take(prefetcher.key(self, offset, limit))
+		if page is not None:
+			self.rows = page.rows
+			self.version = page.version
+			self.next_cursor = page.next_cursor
+			count = page.count
+		elif batch_size is not None:
+			self.rows = StreamedRows(
+				self._build_rows(query.yield_per(batch_size), orders, limit)
+			)
+			count = self.count
+		elif self.singleflight is not None and not self.in_memory:
+			self.rows, count = self._select_shared_rows(query, orders, limit)
+		else:
+			self.rows = self._select_rows(query, orders, limit)
+			count = self.count
+		snapshot.count = count
+		if keyset is not None:
+			# The page starts after the rows before the cursor, which are
+			# counted only if the offset is read.
+			offset = self._offset_after(keyset, count)
+		self.pager = snapshot.pager = Pager(limit=limit, offset=offset,
+											count=count)
 		self.pager.environment = self.environment
+		if (prefetcher is not None and
+				self.pager.offset + self.pager.limit < self.pager.count):
+			prefetcher.prefetch(self, self.pager.offset + self.pager.limit,
+								self.pager.limit)
 		return self
 
+	@property
+	def _nulls_first(self):
+		"""Whether ``NULL`` sorts first in ascending order, see
+		:func:`~dodotable.condition.nulls_first`.
+
+		"""
+		from .condition import nulls_first
+		if self.in_memory:
+			return nulls_first(None)
+		return nulls_first(self.session_for('select'))
+
+	def _offset_after(self, keyset, count):
+		"""Get a callable which locates the page after the keyset by
+		counting rows under the filters after it.  the query is built
+		right away, so later changes of the table don't affect it.
+
+		"""
+		query = self.build_base_query(operation='count').filter(
+			keyset.__query__()
+		)
+		in_memory = self.in_memory
+
+		def offset():
+			after = query.count() if in_memory else count_rows(query)
+			return max(count - after, 0)
+		return offset
+
+	def _parse_since(self, since):
+		"""Parse ``since`` given as a string (e.g. from a query string)
+		into the type of :attr:`version_attribute`.
+
+		:raise dodotable.exc.BadCursor: if ``since`` is malformed
+
+		"""
+		if not isinstance(since, string_types):
+			return since
+		try:
+			python_type = self.version_attribute.type.python_type
+		except (AttributeError, NotImplementedError):
+			return since
+		if issubclass(python_type, string_types):
+			return since
+		value = since.strip()
+		try:
+			if issubclass(python_type, datetime.date):
+				for format_ in (DATETIME_FORMAT, '%Y-%m-%dT%H:%M:%S',
+								'%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S',
+								'%Y-%m-%d'):
+					try:
+						parsed = datetime.datetime.strptime(value, format_)
+					except ValueError:
+						continue
+					if issubclass(python_type, datetime.datetime):
+						return parsed
+					return parsed.date()
+				raise ValueError(value)
+			return python_type(value)
+		except (ValueError, TypeError, ArithmeticError):
+			raise BadCursor('Invalid version for `{0}`: {1}'.format(
+				self.version_attr, since
+			))
+
+	def _fetch_results(self, query):
+		"""Select results of the page query and count rows, for
+		:meth:`_select_shared_rows`.
+
+		"""
+		return list(query), self.count
+
+	def _select_shared_rows(self, query, orders, limit):
+		"""Select rows by :attr:`singleflight`.  Concurrent selects of the
+		same page share only results of its query and the count, and
+		build their own rows.  Records another select loaded are merged
+		into the session of this one first, so they don't load lazily on
+		a session of another thread.
+
+		:return: the rows and the count
+		:rtype: :class:`tuple`
+
+		"""
+		fetched = []
+
+		def fetch():
+			fetched.append(True)
+			return self._fetch_results(query)
+		results, count = self.singleflight.do(('page', query_key(query)),
+											  fetch)
+		if not fetched:
+			results = [self._merge_result(query.session, result)
+					   for result in results]
+		rows = list(self._build_rows(results, orders, limit))
+		mapper = self._row_cache_mapper
+		if mapper is None:
+			return rows, count
+		from .fragment import CachedRow
+		pk_name = mapper.get_property_by_column(mapper.primary_key[0]).key
+		table_key = self.row_cache.table_key(self)
+		keys = []
+		for result in results:
+			record, _ = self._split_previews(result)
+			keys.append((table_key, _get_data(record, pk_name, None),
+						 _get_data(record, self.version_attr, None)))
+		fragments = self.row_cache.get_many(keys)
+		return [
+			CachedRow(self.row_cache, key, fragment) if fragment is not None
+			else CachedRow(self.row_cache, key, row=row)
+			for key, fragment, row in zip(keys, fragments, rows)
+		], count
+
+	def _merge_result(self, session, result):
+		"""Merge the record of a query result loaded on another session
+		into ``session``, without loading it again.
+
+		"""
+		if self._preview_columns:
+			return (session.merge(result[0], load=False),) + \
+				tuple(result[1:])
+		state = inspect(result, raiseerr=False)
+		if state is not None and getattr(state, 'mapper', None) is not None:
+			return session.merge(result, load=False)
+		return result
+
+	@property
+	def _row_cache_mapper(self):
+		"""The mapper of rows if they can be cached by :attr:`row_cache`,
+		or :const:`None`.
+
+		"""
+		if self.row_cache is None or self.in_memory or \
+		   self.version_attr is None:
+			return None
+		mapper = inspect(self.entity, raiseerr=False)
+		if mapper is None or len(mapper.primary_key) != 1:
+			return None
+		return mapper
+
+	def _select_rows(self, query, orders, limit):
+		mapper = self._row_cache_mapper
+		if mapper is None:
+			return list(self._build_rows(query, orders, limit))
+		return self._build_cached_rows(query, orders, limit, mapper)
+
+	@property
+	def _preview_columns(self):
+		"""Visible columns of mapped attributes which have ``preview``."""
+		if self.in_memory or isinstance(self.cls, Query):
+			return []
+		mapper = inspect(self.cls, raiseerr=False)
+		if mapper is None or not hasattr(mapper, 'column_attrs'):
+			return []
+		return [c for c in self.columns
+				if getattr(c, 'preview', None) and
+				c.attr in mapper.column_attrs]
+
+	def _with_previews(self, query):
+		"""Defer attributes of :attr:`_preview_columns` and select their
+		first characters and whether they're longer instead.
+
+		"""
+		columns = self._preview_columns
+		if not columns:
+			return query
+		from sqlalchemy import func
+		from sqlalchemy.orm import defer
+		dialect = query.session.get_bind(self.entity).dialect.name
+		if dialect in CHAR_LENGTH_DIALECTS:
+			length = func.char_length
+		else:
+			length = func.length
+		previews = []
+		for column in columns:
+			attribute = getattr(self.cls, column.attr)
+			previews.append(func.substr(attribute, 1, column.preview))
+			previews.append(length(attribute) > column.preview)
+		return query.options(*[
+			defer(getattr(self.cls, column.attr)) for column in columns
+		]).add_columns(*previews)
+
+	def _load_attribute(self, record, attribute_name):
+		"""Query an attribute of the record by its primary key, e.g. the
+		full text of :class:`Preview`.
+
+		"""
+		mapper = inspect(self.entity)
+		identity = inspect(record).identity
+		if identity is None:
+			identity = mapper.primary_key_from_instance(record)
+		query = self.session_for('select').query(
+			getattr(self.cls, attribute_name)
+		)
+		for column, value in zip(mapper.primary_key, identity):
+			query = query.filter(column == value)
+		return query.scalar()
+
+	def _split_previews(self, result):
+		"""Split a result of :meth:`_with_previews` into the record and
+		its previews by attribute names.
+
+		"""
+		columns = self._preview_columns
+		if not columns:
+			return result, None
+		record = result[0]
+		previews = {}
+		for k, column in enumerate(columns):
+			text, truncated = result[1 + 2 * k], result[2 + 2 * k]
+			if isinstance(text, text_type):
+				text = Preview(text, bool(truncated), record, column.attr,
+							   table=self)
+			previews[column.attr] = text
+		return record, previews
+
+	def _build_row(self, i, data, previews=None):
+		row = Row()
+		previewed = None
+		if previews:
+			previewed = _PreviewedRecord(data, previews)
+		for j, col in enumerate(self.snapshot.columns):
+			record = data
+			if previewed is not None and col.attr in previews:
+				record = previewed
+			row.append(
+				col.__cell__(col=j, row=i, data=record,
+							 attribute_name=col.attr)
+			)
+		return row
+
+	def _update_version(self, version):
+		if version is not None and (self.version is None or
+									version > self.version):
+			self.version = version
+
+	def _build_rows(self, query, orders, limit):
+		last = None
+		i = -1
+		for i, result in enumerate(query):
+			row, previews = self._split_previews(result)
+			_row = self._build_row(i, row, previews)
+			last = row
+			if self.version_attr is not None:
+				self._update_version(_get_data(row, self.version_attr, None))
+			yield _row
+		if last is not None and i + 1 == int(limit):
+			self.next_cursor = encode_cursor(self._sort_key(last, orders))
+
+	def _sort_key(self, record, orders):
+		"""Get values of the record for the sort criteria, e.g. for
+		:attr:`next_cursor`.
+
+		"""
+		if self.in_memory:
+			return [self.cls.position(record)
+					if o.attribute_name == MemorySource.POSITION
+					else _get_data(record, o.attribute_name, None)
+					for o in orders]
+		return [_get_data(record, o.attribute_name, None) for o in orders]
+
+	def _build_cached_rows(self, query, orders, limit, mapper):
+		"""Select primary keys and versions of the page, and load and
+		build only rows which aren't in :attr:`row_cache`.
+
+		"""
+		from .fragment import CachedRow
+		pk_name = mapper.get_property_by_column(mapper.primary_key[0]).key
+		pk_attribute = getattr(self.entity, pk_name)
+		keys = query.with_entities(
+			pk_attribute, self.version_attribute,
+			*[o.attribute for o in orders]
+		).all()
+		table_key = self.row_cache.table_key(self)
+		fragment_keys = [(table_key, key[0], key[1]) for key in keys]
+		fragments = self.row_cache.get_many(fragment_keys)
+		missing = [key[0] for key, fragment in zip(keys, fragments)
+				   if fragment is None]
+		loaded = {}
+		if missing:
+			query = self._with_previews(
+				self.build_base_query().filter(pk_attribute.in_(missing))
+			)
+			for result in query:
+				data, previews = self._split_previews(result)
+				loaded[_get_data(data, pk_name, None)] = data, previews
+		rows = []
+		for i, (key, fragment_key, fragment) in enumerate(
+				zip(keys, fragment_keys, fragments)):
+			if fragment is not None:
+				rows.append(CachedRow(self.row_cache, fragment_key, fragment))
+			elif key[0] in loaded:
+				data, previews = loaded[key[0]]
+				rows.append(CachedRow(self.row_cache, fragment_key,
+									  row=self._build_row(i, data, previews)))
+			self._update_version(key[1])
+		if keys and len(keys) == int(limit):
+			self.next_cursor = encode_cursor(list(keys[-1][2:]))
+		return rows
+
 	def add_filter(self, filter):
+		from .helper import Category, Limit, _Helper
 		self._filters.append(filter)
+		self.snapshot = None
+		if isinstance(filter, Renderable):
+			if isinstance(filter, Category):
+				self.categories.append(filter)
+			if isinstance(filter, Limit):
+				self.limits.append(filter)
+			if isinstance(filter, _Helper):
+				self.helpers.append(filter)
+			else:
+				self.widgets.append(filter)
 
 	@property
-	def _order_queries(self):
-		"""Get the sort criteria of the query."""
+	def in_memory(self):
+		"""(:class:`bool`) Whether rows are records of
+		:class:`~dodotable.memory.MemorySource`.
+
+		"""
+		return isinstance(self.cls, MemorySource)
+
+	@property
+	def entity(self):
+		"""The mapped class of rows."""
+		if isinstance(self.cls, Query):
+			return self.cls.column_descriptions[0]['entity']
+		return self.cls
+
+	@property
+	def _orders(self):
+		"""Get the sort criteria of the query as
+		:class:`~dodotable.condition.Order` objects, in the requested
+		priority of columns (see :attr:`Column.order_priority`).
+
+		The primary key (or :attr:`MemorySource.POSITION
+		<dodotable.memory.MemorySource.POSITION>` of records in memory) is
+		appended as a tiebreaker, so pages are deterministic and can be
+		sought by a keyset cursor.
+
+		"""
+		if self.snapshot is not None:
+			return self.snapshot.orders
 		from .condition import Order
-		order = []
-		for column in self.columns:
-			if column.order_by:
-				o = Order(self.cls, column.attr, column.order_by)
-				order.append(o.__query__())
-		if not order:
+
+		def priority(column):
+			p = getattr(column, 'order_priority', None)
+			return p is None, p or 0
+		columns = sorted((c for c in self.columns if c.order_by),
+						 key=priority)
+		orders = [Order(self.cls, column.attr, column.order_by)
+				  for column in columns]
+		if not orders:
 			k = self.columns[0].attr
 			o = Order(self.cls, k)
 			self.columns[0].order_by = o.order
-			order.append(o.__query__())
-		return order
+			orders.append(o)
+		ordered = set(o.attribute_name for o in orders)
+		entity = self.entity
+		mapper = inspect(entity, raiseerr=False)
+		if self.in_memory:
+			orders.append(Order(entity, MemorySource.POSITION,
+								Order.ASCENDANT))
+		elif mapper is not None and hasattr(mapper, 'primary_key'):
+			for key in mapper.primary_key:
+				name = mapper.get_property_by_column(key).key
+				if name not in ordered:
+					orders.append(Order(entity, name, Order.ASCENDANT))
+		if self.warn_unindexed_order:
+			self._check_order_index(orders[0])
+		return orders
+
+	def _check_order_index(self, order):
+		column = getattr(getattr(order.attribute, 'property', None),
+						 'columns', [None])[0]
+		table = getattr(column, 'table', None)
+		if table is None or not hasattr(table, 'indexes'):
+			return
+		leading_columns = set()
+		for index in table.indexes:
+			leading_columns.update(list(index.columns)[:1])
+		for constraint in table.constraints:
+			leading_columns.update(list(constraint.columns)[:1])
+		if column not in leading_columns:
+			warnings.warn(
+				'{0.__class__.__name__} {0.label!r} is sorted by {1}, '
+				'which no index of {2} leads'.format(self, column, table.name),
+				UnindexedOrderWarning,
+				stacklevel=3
+			)
+
+	@property
+	def _order_queries(self):
+		"""Get the sort criteria of the query."""
+		return [o.__query__() for o in self._orders]
 
 	@property
 	def _filter_queries(self):
+		if self.snapshot is not None:
+			for filter in self.snapshot.filters:
+				yield filter
+			return
 		for filter in self._filters:
 			if filter:
 				yield filter.__query__()
 
 	@property
 	def count(self):
-		return self.build_base_query().count()
+		if self.snapshot is not None and self.snapshot.count is not None:
+			return self.snapshot.count
+		if self._counts_total:
+			return self.total_counter.total(self.session_for('count'))
+		query = self.build_base_query(operation='count')
+		if self.in_memory:
+			return query.count()
+		elif self.singleflight is not None:
+			return self.singleflight.do(('count', query_key(query)),
+										lambda: count_rows(query))
+		return count_rows(query)
 
-	def build_base_query(self):
-		if isinstance(self.cls, Query):
-			query = self.cls
+	@property
+	def _counts_total(self):
+		"""Whether :attr:`count` is the cached total of
+		:attr:`total_counter`.
+
+		"""
+		return (self.total_counter is not None and
+				self.total_counter.cls is self.cls and
+				self.since is None and
+				all(f is None for f in self._filter_queries))
+
+	def build_base_query(self, exclude=(), operation='select'):
+		"""Build the query of rows under the filters, without sort
+		criteria.
+
+		:param exclude: filters to leave out
+		:param str operation: the operation the query is for, which
+							  decides its session.  see :meth:`session_for`
+		"""
+		if self.in_memory:
+			query = self.cls.query()
+		elif isinstance(self.cls, Query):
+			query = self.cls.with_session(self.session_for(operation))
+		else:
+			query = self.session_for(operation).query(self.cls)
+		if exclude:
+			filters = (f.__query__() for f in self._filters
+					   if f and not any(f is e for e in exclude))
 		else:
-			query = self.session.query(self.cls)
-		for filter in self._filter_queries:
+			filters = self._filter_queries
+		for filter in filters:
 			if filter is not None:
 				query = query.filter(filter)
+		if self.since is not None:
+			query = query.filter(self.version_attribute > self.since)
 		return query
 
+	def data_version(self):
+		"""Get the greatest :attr:`version_attr` and the number of rows
+		under the filters, which change whenever a row is inserted, deleted
+		or changed (as long as changes increase :attr:`version_attr`).
+		Both are aggregated by one query, which is cheap if
+		:attr:`version_attr` is indexed.  The number is always counted on
+		the database rather than taken from ``total_counter``, which
+		doesn't see changes of other processes until it's reconciled.
+
+		:return: a pair of the greatest version and the number of rows
+		:rtype: :class:`tuple`
+		:raise ValueError: if :attr:`version_attr` isn't set
+
+		"""
+		version_attribute = self.version_attribute
+		query = self.build_base_query(operation='count')
+		if self.in_memory:
+			versions = [_get_data(record, self.version_attr, None)
+						for record in query]
+			present = [v for v in versions if v is not None]
+			return (max(present) if present else None), len(versions)
+		from sqlalchemy import func
+		version, count = query.order_by(None).with_entities(
+			func.max(version_attribute), func.count()
+		).one()
+		return version, count
+
+	def etag(self, offset=0, limit=10, salt=None):
+		"""Make an entity tag of the page, which changes when its data
+		(see :meth:`data_version`) or how it's rendered (the filters, sort
+		criteria, page, columns and locale) changes.  Rows aren't selected,
+		so a request which has the page already can be answered by
+		``304 Not Modified`` cheaply, e.g. by
+		:meth:`~dodotable.environment.flask.FlaskEnvironment.conditional_response`.
+
+		:param int offset: the offset of the page
+		:param int limit: the size of the page
+		:param salt: anything else the page depends on, e.g. the version
+					 of the application's templates
+		:return: a hex digest
+		:rtype: :class:`str`
+		:raise ValueError: if :attr:`version_attr` isn't set
+
+		"""
+		version = self.data_version()
+		state = None if self.in_memory else query_key(self.query)
+		get_locale = getattr(self.environment, 'get_locale', None)
+		parts = (
+			version, state, int(offset), int(limit),
+			_stable_key(tuple(c.definition_key for c in self.columns)),
+			get_locale() if get_locale is not None else None,
+			self.label, self.unit_label, salt,
+		)
+		return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+	@property
+	def version_attribute(self):
+		"""The attribute of :attr:`version_attr`."""
+		if self.version_attr is None:
+			raise ValueError('{0.__class__.__name__}.version_attr is not '
+							 'set and {0.entity!r} has no version_id_col'
+							 ''.format(self))
+		return _get_data(self.entity, self.version_attr, None)
+
 	@property
 	def query(self):
 		"""Create a query.
 
 		:return:
 		"""
+		if self.in_memory:
+			return self.build_base_query().order_by(*self._orders)
 		query = self.build_base_query().order_by(*self._order_queries)
 		return query
 
 	@property
 	def columns(self):
+		if self.snapshot is not None:
+			return self.snapshot.columns
 		return [column for column in self._columns if column.visible]
 
+	def count_facets(self, cache=None):
+		"""Count rows of every choice of the select filters (including
+		:class:`~dodotable.helper.Category`) by one grouped query per
+		filter, under the other filters.  Counts are set to
+		:attr:`~dodotable.condition.SelectFilter.counts` of filters and
+		rendered next to their choices.
+
+		:param cache: a cache of counts shared by requests.  counts are
+					  cached by the SQL and parameters of their query
+		:type cache: :class:`~dodotable.cache.LRUCache`
+		:return: counts of choices by attribute names of filters
+		:rtype: :class:`dict`
+
+		"""
+		from sqlalchemy import func
+		from .condition import SelectFilter
+		facets = {}
+		for filter in self._filters:
+			if not isinstance(filter, SelectFilter):
+				continue
+			query = self.build_base_query(exclude=[filter],
+										  operation='facets')
+			if self.in_memory:
+				groups = query.count_groups(filter.attribute_name)
+				filter.counts = facets[filter.attribute_name] = \
+					filter.count_choices(groups)
+				continue
+			query = query.with_entities(
+				filter.attribute, func.count()
+			).group_by(filter.attribute).order_by(None)
+			groups = None
+			if cache is not None:
+				key = query_key(query)
+				groups = cache.get(key)
+			if groups is None:
+				groups = [tuple(group) for group in query]
+				if cache is not None:
+					cache.set(key, groups)
+			filter.counts = facets[filter.attribute_name] = \
+				filter.count_choices(groups)
+		return facets
+
+	def count_queries(self, budget=None):
+		"""Count SQL statements issued on the table's session, e.g. while
+		selecting and rendering it.
+
+		:param budget: the maximum number of statements
+		:return: a context manager
+		:rtype: :class:`~dodotable.counter.QueryCounter`
+
+		"""
+		from .counter import QueryCounter
+		return QueryCounter(self.session_for('select'), budget=budget)
+
 	def __html__(self):
 		return self.render('table.html', table=self)
 
+	def __json__(self):
+		"""Serialize the selected page without rendering HTML.
+
+		:return: a value which can be serialized by
+				 :func:`~dodotable.util.to_json`
+		:rtype: :class:`dict`
+
+		"""
+		return {
+			'label': self.label,
+			'unit_label': self.unit_label,
+			'columns': [column.__json__() for column in self.columns],
+			'rows': [row.__json__() for row in self.rows],
+			'pager': self.pager.__json__(),
+			'next_cursor': self.next_cursor,
+			'version': self.version,
+		}
+
 	def __query__(self):
 		return self.query
+
+
+class TableDefinition(object):
+	"""The static schema of a table (model, label, columns and filters)
+	which is built once, e.g. at import time, and shared by threads.
+	:meth:`bind` makes a cheap :class:`Table` for each request.
+
+	.. code-block:: python
+
+	   MUSIC_TABLE = TableDefinition(
+		   Music, 'music',
+		   columns=[
+			   Column(attr='id', label=u'id', order_by='id.desc'),
+			   Column(attr='name', label=u'name',
+					  filters=[Ilike(Music, 'name', {})]),
+		   ],
+		   filters=[
+			   lambda table, request_args: IlikeSet(table, request_args),
+			   lambda table, request_args: Limit(table, request_args),
+		   ]
+	   )
+
+	   @app.route('/musics/')
+	   def list_musics():
+		   table = MUSIC_TABLE.bind(request_args=request.args)
+		   return render_template('musics.html', table=table.select())
+
+	Columns and their filters are copied by :meth:`Column.bind` for every
+	request, so the definition itself is never mutated.
+
+	:param cls:
+	:param label:
+	:param unit_label:
+	:param columns:
+	:param filters: functions which take a bound table and request args
+					and return a filter to add to the table
+	:param table_class: the class of bound tables
+	:param options: other keyword arguments of ``table_class``, e.g.
+					``version_attr``
+
+	"""
+
+	def __init__(self, cls, label, unit_label='row', columns=(), filters=(),
+				 table_class=Table, **options):
+		self.cls = cls
+		self.label = label
+		self.unit_label = unit_label
+		self.columns = tuple(columns)
+		self.filters = tuple(filters)
+		self.table_class = table_class
+		self.options = options
+
+	def bind(self, sqlalchemy_session=None, request_args=None):
+		"""Make a table for a request.
+
+		:param sqlalchemy_session: the session of the request.
+								   :meth:`~.environment.Environment.get_session`
+								   by default
+		:param request_args:
+		:type request_args: :class:`~collections.abc.Mapping`
+		:rtype: :class:`Table`
+
+		"""
+		if request_args is None:
+			request_args = {}
+		table = self.table_class(
+			self.cls, self.label, unit_label=self.unit_label,
+			columns=[column.bind(request_args) for column in self.columns],
+			sqlalchemy_session=sqlalchemy_session,
+			**self.options
+		)
+		for factory in self.filters:
+			table.add_filter(factory(table, request_args))
+		return table
+
+
+class TableGroup(Schema, Renderable):
+	"""Tables shown on the same page.
+
+	:meth:`select` runs the queries of every table concurrently, each in its
+	own thread on its own session (so on its own pooled connection), so
+	the latency is close to the slowest table rather than the sum of them.
+	Every table is rendered by one template afterward.
+
+	.. code-block:: python
+
+	   with TableGroup() as group:
+		   group.add(music_table, offset=0, limit=10)
+		   group.add(tag_table, offset=0, limit=50)
+		   html = group.select().__html__()
+
+	:param tables: tables to select with the default offset and limit
+	:param session_factory: a function which takes a table and returns
+							a new session for it.  a session bound to
+							the same engine of the table's read session
+							(see :meth:`Table.session_for`) by default
+	:param int max_workers: the maximum number of threads selecting tables
+							at once
+
+	"""
+
+	def __init__(self, tables=(), session_factory=None, max_workers=4):
+		self.tables = []
+		self.max_workers = max_workers
+		self._pages = []
+		self._sessions = []
+		if session_factory is None:
+			session_factory = self.create_session
+		self.session_factory = session_factory
+		for table in tables:
+			self.add(table)
+
+	@staticmethod
+	def create_session(table):
+		return Session(bind=table.session_for('select').get_bind())
+
+	def add(self, table, offset=Pager.DEFAULT_OFFSET,
+			limit=Pager.DEFAULT_LIMIT):
+		self.tables.append(table)
+		self._pages.append((offset, limit))
+		return self
+
+	def select(self):
+		"""Select every table concurrently.
+
+		The tables keep their new sessions until :meth:`close`, so rendering
+		(and loading lazy attributes) happens on them.  Tables are selected
+		in the context of the caller (e.g. the Flask request), see
+		:meth:`~dodotable.environment.Environment.copy_context`.  If some
+		of them fail, the first error is raised and the others are logged.
+
+		"""
+		jobs = []
+		for table, (offset, limit) in zip(self.tables, self._pages):
+			session = self.session_factory(table)
+			self._sessions.append((table, table.session, table.read_session,
+								   session))
+			table.session = table.read_session = session
+
+			def job(table=table, offset=offset, limit=limit):
+				table.select(offset=offset, limit=limit)
+			jobs.append(table.environment.copy_context(job))
+		jobs = collections.deque(jobs)
+		errors = []
+		lock = threading.Lock()
+
+		def work():
+			while True:
+				with lock:
+					if not jobs:
+						return
+					job = jobs.popleft()
+				try:
+					job()
+				except Exception:
+					errors.append(sys.exc_info())
+
+		threads = [threading.Thread(target=work)
+				   for _ in range(min(self.max_workers, len(jobs)))]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		if errors:
+			for exc_info in errors[1:]:
+				logger.error('failed to select a table of the group',
+							 exc_info=exc_info)
+			reraise(*errors[0])
+		return self
+
+	def close(self):
+		"""Close sessions opened by :meth:`select` and give tables back
+		their own sessions.
+
+		"""
+		while self._sessions:
+			table, original_session, read_session, session = \
+				self._sessions.pop()
+			table.session = original_session
+			table.read_session = read_session
+			session.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __html__(self):
+		return self.render('table_group.html', group=self)
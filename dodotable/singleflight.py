@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.singleflight` --- coalescing of identical calls
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+When many people refresh the same listing at once, every worker runs the
+same count and page queries at the same moment.  A :class:`SingleFlight`
+given to :class:`~dodotable.schema.Table` lets concurrent selects of the
+same state (the same compiled query) wait for one of them and share its
+result, so the database runs them once.
+
+.. code-block:: python
+
+   singleflight = SingleFlight(timeout=10)
+
+   @app.route('/dashboard/')
+   def dashboard():
+       table = Table(cls=Event, label='event', columns=[...],
+                     singleflight=singleflight)
+       return render_template('dashboard.html',
+                              table=table.select(offset, limit))
+
+Selects share only results of the page query and the count, and build
+their own rows (and urls of :class:`~dodotable.schema.LinkedCell`).
+Records loaded by another select are merged into the session of each
+waiting select without being loaded again, so lazy loads of them run on
+its own session rather than a session of another thread.
+
+"""
+import sys
+import threading
+
+import six
+
+from .exc import SingleFlightTimeout
+
+
+__all__ = 'SingleFlight',
+
+
+class _Call(object):
+
+    __slots__ = 'event', 'result', 'exc_info'
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """Coalesce concurrent calls of the same key into one call.
+
+    :param timeout: seconds a call waits for an identical in-flight call.
+                    :const:`None` means forever
+    :type timeout: :class:`numbers.Real`
+
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, timeout=None):
+        """Call ``function`` unless a call of ``key`` is in flight, or wait
+        for it and share its result.  If it raises an error, waiting calls
+        raise the same error.
+
+        :param key: a hashable key of the call
+        :param function: a nullary function to call
+        :param timeout: seconds to wait.  :attr:`timeout` by default
+        :return: the result of the call
+        :raise dodotable.exc.SingleFlightTimeout: when it waits longer
+                                                  than ``timeout``
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = function()
+            except BaseException:
+                call.exc_info = sys.exc_info()
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+            return call.result
+        if timeout is None:
+            timeout = self.timeout
+        if not call.event.wait(timeout):
+            raise SingleFlightTimeout(key, timeout)
+        if call.exc_info is not None:
+            six.reraise(*call.exc_info)
+        return call.result
+
+    def in_flight(self):
+        """(:class:`int`) The number of calls in flight."""
+        return len(self._calls)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+""":mod:`dodotable.totals` --- counter cache of unfiltered totals
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Most views of a table are unfiltered, but counting every row of a large
+table is still a full scan.  A :class:`TotalCounter` keeps the number of
+rows of a mapped class in memory: it counts once, then follows inserts and
+deletes flushed by sessions of the process, and applies them when their
+transaction commits.  :class:`~dodotable.schema.Table` uses it for
+:attr:`~dodotable.schema.Table.count` when no filter is applied.
+
+.. code-block:: python
+
+   music_total = TotalCounter(Music, reconcile_interval=600)
+
+   @app.route('/musics/')
+   def list_musics():
+       table = Table(cls=Music, label='music', columns=[...],
+                     total_counter=music_total)
+       return render_template('musics.html',
+                              table=table.select(offset, limit))
+
+Rows changed where the ORM doesn't see them (e.g. Core statements, bulk
+inserts or other processes) are caught up by counting again every
+``reconcile_interval`` seconds, and bulk deletes and rolled back
+transactions make it count again on the next use.  :meth:`TotalCounter.drift`
+tells how far off it is.
+
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .cache import clock
+from .util import count_rows
+
+
+__all__ = 'TotalCounter',
+
+
+class TotalCounter(object):
+    """The cached number of rows of a mapped class.
+
+    :param cls: a mapped class
+    :param reconcile_interval: seconds after which the total is counted
+                               again.  :const:`None` means never
+    :type reconcile_interval: :class:`numbers.Real`
+
+    """
+
+    def __init__(self, cls, reconcile_interval=None):
+        self.cls = cls
+        self.reconcile_interval = reconcile_interval
+        self._total = None
+        self._counted_at = None
+        # Bumped whenever the total changes or is forgotten, so counts
+        # which ran meanwhile aren't stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listeners = [
+            (cls, 'after_insert', self._after_insert, {'propagate': True}),
+            (cls, 'after_delete', self._after_delete, {'propagate': True}),
+            (Session, 'after_bulk_delete', self._after_bulk_delete, {}),
+            (Session, 'after_commit', self._after_commit, {}),
+            (Session, 'after_rollback', self._after_rollback, {}),
+        ]
+        for target, name, listener, kwargs in self._listeners:
+            event.listen(target, name, listener, **kwargs)
+
+    def remove(self):
+        """Stop following changes of sessions."""
+        for target, name, listener, _ in self._listeners:
+            event.remove(target, name, listener)
+        self.invalidate()
+
+    def total(self, session):
+        """Get the number of rows, counted on ``session`` unless it's
+        cached.
+
+        :param session: a session to count rows on
+        :type session: :class:`~sqlalchemy.orm.session.Session`
+        :rtype: :class:`int`
+
+        """
+        with self._lock:
+            total = self._total
+            if total is not None and self.reconcile_interval is not None and \
+               self._counted_at + self.reconcile_interval <= clock():
+                total = None
+        if total is None:
+            total = self.reconcile(session)
+        return total
+
+    def reconcile(self, session):
+        """Count rows on ``session`` and replace the cached total.  If
+        a transaction commits changes (or the total is invalidated) while
+        counting, the count isn't cached because it may miss them.
+
+        :rtype: :class:`int`
+
+        """
+        with self._lock:
+            generation = self._generation
+        total = count_rows(session.query(self.cls))
+        self._store(total, generation)
+        return total
+
+    def _store(self, total, generation):
+        with self._lock:
+            if self._generation == generation:
+                self._total = total
+                self._counted_at = clock()
+
+    def invalidate(self):
+        """Forget the total, so it's counted on the next use."""
+        with self._lock:
+            self._total = None
+            self._generation += 1
+
+    def drift(self, session, reconcile=False):
+        """Compare the cached total with the real number of rows.
+
+        :param session: a session to count rows on
+        :param bool reconcile: whether to replace the cached total with
+                               the real one as well
+        :return: the real number minus the cached one, or :const:`None` if
+                 nothing is cached
+        :rtype: :class:`int`
+
+        """
+        with self._lock:
+            cached = self._total
+            generation = self._generation
+        real = count_rows(session.query(self.cls))
+        if reconcile:
+            self._store(real, generation)
+        if cached is None:
+            return None
+        return real - cached
+
+    def _pending(self, session):
+        return session.info.setdefault('dodotable.totals', {})
+
+    def _add_pending(self, target, delta):
+        session = object_session(target)
+        if session is None:
+            self.invalidate()
+            return
+        pending = self._pending(session)
+        if self in pending and pending[self] is None:
+            return
+        pending[self] = pending.get(self, 0) + delta
+
+    def _after_insert(self, mapper, connection, target):
+        self._add_pending(target, 1)
+
+    def _after_delete(self, mapper, connection, target):
+        self._add_pending(target, -1)
+
+    def _after_bulk_delete(self, delete_context):
+        mapper = getattr(delete_context, 'mapper', None)
+        if mapper is None or issubclass(mapper.class_, self.cls) or \
+           issubclass(self.cls, mapper.class_):
+            self._pending(delete_context.session)[self] = None
+
+    def _after_commit(self, session):
+        pending = session.info.get('dodotable.totals')
+        if not pending or self not in pending:
+            return
+        delta = pending.pop(self)
+        if delta == 0:
+            return
+        with self._lock:
+            if delta is None:
+                self._total = None
+            elif self._total is not None:
+                self._total += delta
+            self._generation += 1
+
+    def _after_rollback(self, session):
+        pending = session.info.get('dodotable.totals')
+        if pending and pending.pop(self, 0) != 0:
+            # Flushes of a rolled back savepoint can't be told apart from
+            # the rest, so count again.
+            self.invalidate()
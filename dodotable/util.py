@@ -3,18 +3,28 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 """
+import base64
 import codecs
+import datetime
+import decimal
 import gettext
+import json
 import numbers
 import re
 
-from jinja2 import Environment, PackageLoader
-from six import PY2, text_type
+from six import PY2, integer_types, string_types, text_type
+from sqlalchemy import distinct, func, inspect
+from sqlalchemy.exc import NoInspectionAvailable
+from sqlalchemy.sql.expression import Join
+
+from .exc import BadCursor
 
 
 __all__ = (
-    'camel_to_underscore', 'render', '_get_data',
-    'string_literal',
+    'JSON_TYPES', 'camel_to_underscore', 'compile_templates', 'count_rows',
+    'create_jinja_environment', 'decode_cursor', 'encode_cursor',
+    'identity_key', 'query_key', 'render', '_get_data', 'shallow_copy',
+    'string_literal', 'to_json',
 )
 
 
@@ -23,6 +33,12 @@ first_cap_re = re.compile('(.)([A-Z][a-z]+)')
 #: (:class:`_sre.SRE_Pattern`) Find all capital letters that are not first in a word.
 all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
+#: (:class:`tuple`) Types which are serialized into JSON as they are.
+JSON_TYPES = integer_types + (float, text_type) + string_types
+
+#: (:class:`str`) The format of :class:`datetime.datetime` in cursors.
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
 
 def camel_to_underscore(name):
     """CamelCase Given by ``name`` of underscore_with_lower_case Convert to
@@ -41,48 +57,326 @@ def camel_to_underscore(name):
     return all_cap_re.sub(r'\1_\2', s1).lower()
 
 
-def render(template_name, extra_environments=None, **kwargs):
+def create_jinja_environment(loader=None, compiled_templates=None):
+    """Create a Jinja environment to render dodotable templates.
+
+    :param loader: a template loader.  templates of dodotable by default
+    :type loader: :class:`jinja2.loaders.BaseLoader`
+    :param str compiled_templates: a path of templates precompiled by
+                                   :func:`compile_templates`.  they are
+                                   preferred to ones of ``loader``
+    :rtype: :class:`jinja2.Environment`
+
+    """
+    from jinja2 import ChoiceLoader, Environment, ModuleLoader, PackageLoader
+    if not loader:
+        loader = PackageLoader('dodotable', 'templates')
+    if compiled_templates:
+        loader = ChoiceLoader([ModuleLoader(compiled_templates), loader])
+    env = Environment(loader=loader,
+                      extensions=['jinja2.ext.i18n', 'jinja2.ext.with_'],
+                      autoescape=True)
+    # Translations are given to every render by the context,
+    # so the environment can be shared by locales.
+    env.install_null_translations()
+    return env
+
+
+def compile_templates(target, loader=None, zip='deflated'):
+    """Precompile templates into Python modules, so processes don't parse
+    and compile them on the first render.  Give ``target`` to
+    :attr:`~dodotable.environment.Environment.compiled_templates` to use
+    them.
+
+    .. code-block:: console
+
+       $ python -c "from dodotable.util import compile_templates;
+       > compile_templates('build/dodotable-templates.zip')"
+
+    :param str target: a path of a zip file, or a directory
+                       if ``zip`` is :const:`None`
+    :param loader: a loader of templates to compile.
+                   templates of dodotable by default
+    :type loader: :class:`jinja2.loaders.BaseLoader`
+    :param str zip: the compression of the zip file
+
+    """
+    env = create_jinja_environment(loader)
+    env.compile_templates(target, zip=zip, ignore_errors=False)
+
+
+#: (:class:`jinja2.Environment`) The shared environment of :func:`render`
+#: with the default loader.
+_default_jinja_environment = None
+
+
+def render(template_name, extra_environments=None, jinja_environment=None,
+           **kwargs):
     """Render the given template with jinja
 
     :param template_name:
+    :param extra_environments: global variables of the template
+    :type extra_environments: :class:`~collections.abc.Mapping`
+    :param jinja_environment: a (shared) environment to render by
+    :type jinja_environment: :class:`jinja2.Environment`
     :return:
 
     """
+    global _default_jinja_environment
     if extra_environments is None:
         extra_environments = {}
-    default_loader = PackageLoader('dodotable', 'templates')
-    loader = extra_environments.get(
-        'template_loader',
-        default_loader)
-    if not loader:
-        loader = default_loader
+    if jinja_environment is None:
+        loader = extra_environments.get('template_loader')
+        if loader:
+            jinja_environment = create_jinja_environment(loader)
+        else:
+            if _default_jinja_environment is None:
+                _default_jinja_environment = create_jinja_environment()
+            jinja_environment = _default_jinja_environment
     get_translations = extra_environments.get('get_translations')
-    env = Environment(loader=loader,
-                      extensions=['jinja2.ext.i18n', 'jinja2.ext.with_'],
-                      autoescape=True)
-    env.globals.update(extra_environments)
     translations = get_translations() if callable(get_translations) else None
     if translations is None:
         translations = gettext.NullTranslations()
-    env.install_gettext_translations(translations)
-    template = env.get_template(template_name)
-    return template.render(**kwargs)
+    context = dict(extra_environments)
+    if PY2:
+        context.update(gettext=translations.ugettext,
+                       ngettext=translations.ungettext)
+    else:
+        context.update(gettext=translations.gettext,
+                       ngettext=translations.ngettext)
+    context.update(kwargs)
+    template = jinja_environment.get_template(template_name)
+    return template.render(context)
+
+
+#: (:class:`dict`) Memoized ``attribute_name.split('.')`` of
+#: :func:`_get_data`.
+_name_chains = {}
 
 
 def _get_data(data, attribute_name, default):
-    name_chain = attribute_name.split('.')
-
-    def __data__(_data, name_chain):
-        # print ("_data {} | name_chain {}".format(_data, name_chain))
-        if len(name_chain) > 0:
-            try:
-                return __data__(getattr(_data, name_chain[0]),
-                                name_chain[1:])
-            except AttributeError:
-                return default
-        return _data
-
-    return __data__(data, name_chain)
+    try:
+        name_chain = _name_chains[attribute_name]
+    except KeyError:
+        name_chain = _name_chains[attribute_name] = \
+            tuple(attribute_name.split('.'))
+    for name in name_chain:
+        try:
+            data = getattr(data, name)
+        except AttributeError:
+            return default
+    return data
+
+
+def shallow_copy(obj):
+    """Copy an object sharing its attributes.  It's cheaper than
+    :func:`copy.copy` for plain objects.
+
+    """
+    copied = obj.__class__.__new__(obj.__class__)
+    copied.__dict__.update(obj.__dict__)
+    return copied
+
+
+def identity_key(instance):
+    """Get the identity key of a persistent mapped instance.
+
+    :return: the identity key, or :const:`None` if ``instance`` isn't
+             a persistent mapped instance
+    :rtype: :class:`tuple`
+
+    """
+    try:
+        state = inspect(instance)
+    except NoInspectionAvailable:
+        return None
+    return getattr(state, 'identity_key', None)
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def query_key(query):
+    """Make a hashable key of a query from the database it's bound to and
+    its SQL and parameters, so results of the same query on the same
+    database can be shared.
+
+    :param query: a query
+    :type query: :class:`~sqlalchemy.orm.query.Query`
+    :rtype: :class:`tuple`
+
+    """
+    statement = query.statement
+    bind = None
+    if query.session is not None:
+        bind = query.session.get_bind(clause=statement)
+    if bind is None:
+        dialect = url = None
+    else:
+        dialect = bind.dialect
+        url = text_type(bind.engine.url)
+    compiled = statement.compile(dialect=dialect)
+    params = tuple(sorted((k, _hashable(v))
+                          for k, v in compiled.params.items()))
+    return url, text_type(compiled), params
+
+
+#: (:class:`tuple`) Attributes of :class:`~sqlalchemy.sql.expression.Select`
+#: (across SQLAlchemy versions) for clauses which change rows of a query.
+_ROW_CLAUSES = ('_distinct', '_group_by_clause', '_group_by_clauses',
+                '_having', '_having_criteria', '_limit_clause',
+                '_offset_clause')
+
+
+def _has_row_clauses(statement):
+    for name in _ROW_CLAUSES:
+        value = getattr(statement, name, None)
+        if value is None or value is False:
+            continue
+        elif hasattr(value, '__len__'):
+            if len(value):
+                return True
+        else:
+            return True
+    return False
+
+
+def _may_multiply(statement):
+    """Whether joins of the statement may repeat rows of its entity."""
+    get_final_froms = getattr(statement, 'get_final_froms', None)
+    froms = get_final_froms() if get_final_froms else statement.froms
+    return len(froms) != 1 or isinstance(froms[0], Join)
+
+
+def count_rows(query):
+    """Count rows of the query by a minimal ``SELECT count(...)``.
+
+    :meth:`Query.count() <sqlalchemy.orm.query.Query.count>` wraps the whole
+    statement (sort criteria, eager loads and every selected column) in
+    a subquery.  Rows of a query of an entity are counted by its primary
+    key instead, distinct if joins may repeat rows.  Other queries (e.g.
+    with ``DISTINCT``, ``GROUP BY`` or ``LIMIT``) are counted by
+    :meth:`~sqlalchemy.orm.query.Query.count`.
+
+    :param query: the query to count
+    :type query: :class:`~sqlalchemy.orm.query.Query`
+    :rtype: :class:`int`
+
+    """
+    descriptions = query.column_descriptions
+    if len(descriptions) != 1 or _has_row_clauses(query.statement):
+        return query.count()
+    query = query.order_by(None)
+    statement = query.statement
+    entity = descriptions[0]['entity']
+    mapper = inspect(entity, raiseerr=False)
+    if (descriptions[0]['expr'] is not entity or mapper is None or
+            len(mapper.primary_key) != 1):
+        return query.count()
+    key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    pk = getattr(entity, key)
+    if _may_multiply(statement):
+        count = func.count(distinct(pk))
+    else:
+        count = func.count(pk)
+    return query.with_entities(count).scalar()
+
+
+def _json_default(value):
+    if hasattr(value, '__json__'):
+        return value.__json__()
+    elif isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    elif isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def to_json(value):
+    """Serialize ``value`` into JSON.  Objects which implement ``__json__``
+    (e.g. :class:`~dodotable.schema.Table`) are serialized by it, and dates
+    and decimals are serialized as strings.
+
+    .. code-block:: python
+
+       >>> to_json(table.select(offset=0, limit=10))
+       '{"columns": [...], "next_cursor": "...", "pager": {...}, ...}'
+
+    :rtype: :class:`str`
+
+    """
+    return json.dumps(value, default=_json_default, sort_keys=True)
+
+
+def _encode_cursor_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.strftime(DATETIME_FORMAT)}
+    elif isinstance(value, datetime.date):
+        return {'date': value.strftime('%Y-%m-%d')}
+    elif isinstance(value, decimal.Decimal):
+        return {'decimal': str(value)}
+    elif value is None or isinstance(value, JSON_TYPES):
+        return value
+    raise TypeError('{!r} cannot be a cursor value'.format(value))
+
+
+def _decode_cursor_value(value):
+    if not isinstance(value, dict):
+        return value
+    elif 'datetime' in value:
+        return datetime.datetime.strptime(value['datetime'], DATETIME_FORMAT)
+    elif 'date' in value:
+        return datetime.datetime.strptime(value['date'], '%Y-%m-%d').date()
+    elif 'decimal' in value:
+        return decimal.Decimal(value['decimal'])
+    raise ValueError('unknown cursor value: {!r}'.format(value))
+
+
+def encode_cursor(values):
+    """Encode sort key values of a row into an opaque, url-safe keyset
+    cursor.
+
+    .. note::
+
+       Timezone of :class:`datetime.datetime` values isn't kept.
+
+    :param values: sort key values
+    :type values: :class:`~collections.abc.Sequence`
+    :rtype: :class:`str`
+
+    """
+    payload = json.dumps([_encode_cursor_value(v) for v in values],
+                         separators=(',', ':'))
+    cursor = base64.urlsafe_b64encode(payload.encode('utf-8'))
+    return cursor.decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor encoded by :func:`encode_cursor`.
+
+    :param str cursor: the cursor
+    :return: sort key values
+    :rtype: :class:`list`
+    :raise dodotable.exc.BadCursor: when the cursor is malformed
+
+    """
+    try:
+        cursor = str(cursor)
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = base64.urlsafe_b64decode(padded.encode('ascii'))
+        values = json.loads(payload.decode('utf-8'))
+        if not isinstance(values, list):
+            raise ValueError('cursor must be a list')
+        return [_decode_cursor_value(v) for v in values]
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise BadCursor('invalid cursor {!r}: {}'.format(cursor, e))
 
 
 if PY2:
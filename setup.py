@@ -55,7 +55,7 @@ setup(
     license='MIT',
     author='Kang Hyojun',
     author_email='ed' '@' 'spoqa.com',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
     package_data={
         'dodotable': ['locale/*/LC_MESSAGES/*.mo', 'templates/*.html'],
     },
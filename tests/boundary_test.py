@@ -0,0 +1,46 @@
+from mock import PropertyMock, patch
+
+from .entities import Music
+from .helper import DodotableTestEnvironment
+from dodotable.boundary import PageBoundaryIndex
+from dodotable.schema import Column, Table
+
+
+def make_table(session, page_index):
+    return Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id'),
+        Column(attr='name', label=u'name', order_by='name.desc'),
+    ], sqlalchemy_session=session, page_index=page_index)
+
+
+def names(table):
+    return [row[1].data for row in table.rows]
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_page_boundary_index(environ, fx_session):
+    for i in range(23):
+        fx_session.add(Music(name=u'{:02d}'.format(i % 20)))
+    fx_session.commit()
+    page_index = PageBoundaryIndex(pages_ahead=1)
+    for offset in range(0, 30, 5):
+        expected = names(make_table(fx_session, None).select(offset, 5))
+        table = make_table(fx_session, page_index)
+        with table.count_queries() as counter:
+            table.select(offset=offset, limit=5)
+        assert names(table) == expected
+        page_queries = [s for s in counter.statements
+                        if 'row_number' not in s and 'count(' not in s]
+        assert len(page_queries) == 1
+        # Pages after sampled boundaries are sought rather than skipped.
+        assert ('WHERE' in page_queries[0]) == (0 < offset <= 20)
+    # Boundaries are sampled a page ahead of the requested one at a time.
+    assert len(page_index.cache.get(PageBoundaryIndex.key(table, 5))
+               .values) == 4
+    table = make_table(fx_session, page_index)
+    with table.count_queries() as counter:
+        table.select(offset=10, limit=5)
+    assert not any('row_number' in s for s in counter.statements)
+    # Unaligned offsets skip rows.
+    assert page_index.boundary(table, table._orders, 7, 5) is None
@@ -0,0 +1,30 @@
+from mock import patch
+
+from dodotable.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    # b is the least recently used.
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+    assert cache.pop('a') == 1
+    assert cache.get('a', 'default') == 'default'
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(maxsize=2, ttl=10)
+    with patch('dodotable.cache.clock', return_value=100):
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=20)
+    with patch('dodotable.cache.clock', return_value=115):
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+    with patch('dodotable.cache.clock', return_value=120):
+        assert cache.pop('b') is None
@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
+import datetime
 import re
 
 from mock import PropertyMock, patch
-from pytest import mark
+from pytest import mark, raises
 
-from .entities import Music, Tag
+from .entities import Event, Music, Tag
 from .helper import DodotableTestEnvironment, extract_soup
-from dodotable.condition import (Ilike, IlikeAlias, IlikeSet, SelectFilter,
-                                 create_search_name)
+from dodotable.cache import LRUCache
+from dodotable.condition import (DateRange, DistinctSelectFilter, Ilike,
+                                 IlikeAlias, IlikeSet, NumericRange, Order,
+                                 SelectFilter, SortSpec, create_search_name)
+from dodotable.counter import QueryCounter
+from dodotable.exc import BadChoice, BadRange
 from dodotable.schema import Column, Table
 from dodotable.util import camel_to_underscore
 
@@ -109,3 +114,174 @@ def test_ilike_alias(fx_tags, t, fx_session):
                     .filter(IlikeAlias('tag_type', alias_type,
                                        {'select.tag_type': t}).__query__())
     assert all([tg.t == t for tg in tag])
+
+
+def test_sort_spec():
+    spec = SortSpec.parse('name.asc, id.desc,bad,name.desc,t.wrong')
+    # The last order of a repeated attribute wins at its first priority.
+    assert spec.items == (('name', 'desc'), ('id', 'desc'))
+    assert spec.priority_of('name') == 0
+    assert spec.order_of('id') == 'desc'
+    assert spec.priority_of('id') == 1
+    assert spec.order_of('t') is None
+    assert spec.priority_of('t') is None
+    assert SortSpec.parse('name.asc, id.desc,bad,name.desc,t.wrong') is spec
+    assert not SortSpec.parse(None)
+    assert Order.of_column('name', 'id.desc,name.asc') == 'asc'
+    assert Order.of_column('name', 'name.desc,name.asc') == 'asc'
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_count_facets(environ, fx_session):
+    for name, t in [(u'a', u'x'), (u'a', u'y'), (u'b', u'x'), (u'c', u'x')]:
+        fx_session.add(Tag(name=name, t=t))
+    fx_session.commit()
+    request_args = {'select.t': u'x'}
+    table = Table(cls=Tag, label=u'tag', columns=[
+        Column(attr='id', label=u'id'),
+    ], sqlalchemy_session=fx_session)
+    name_filter = SelectFilter(Tag, 'name', [
+        {'name': u'a', 'description': u'A'},
+        {'name': u'b', 'description': u'B'},
+    ], request_args, default='all')
+    t_filter = SelectFilter(Tag, 't', [
+        {'name': u'x', 'description': u'X'},
+        {'name': u'y', 'description': u'Y'},
+    ], request_args)
+    table.add_filter(name_filter)
+    table.add_filter(t_filter)
+    cache = LRUCache()
+    with table.count_queries() as counter:
+        facets = table.count_facets(cache=cache)
+    assert counter.count == 2
+    # Counts of a filter are under the other filters only.
+    assert facets['name'] == {'all': 2, u'a': 1, u'b': 1}
+    assert facets['t'] == {'all': 4, u'x': 3, u'y': 1}
+    assert t_filter.counts is facets['t']
+    with table.count_queries() as counter:
+        assert table.count_facets(cache=cache) == facets
+    assert counter.count == 0
+    soup = extract_soup(name_filter)
+    assert [o.text.split() for o in soup.find_all('option')] == [
+        [u'모두', u'(2)'], [u'A', u'(1)'], [u'B', u'(1)'],
+    ]
+    # No selection shows rows of the listed choices only, as many as
+    # 'all' counts.
+    table = Table(cls=Tag, label=u'tag', columns=[
+        Column(attr='id', label=u'id'),
+    ], sqlalchemy_session=fx_session)
+    table.add_filter(SelectFilter(Tag, 'name', [
+        {'name': u'a', 'description': u'A'},
+    ], request_args))
+    table.add_filter(SelectFilter(Tag, 't', [
+        {'name': u'x', 'description': u'X'},
+    ], request_args))
+    facets = table.count_facets()
+    assert table.count == facets['name']['all'] == 1
+
+
+def test_date_range(fx_session):
+    now = datetime.datetime(2017, 3, 10, 12, 30, 45)
+    for days in range(10):
+        created_at = now - datetime.timedelta(days=days, hours=1)
+        fx_session.add(Event(created_at=created_at, day=created_at.date()))
+    fx_session.commit()
+
+    def select(attribute_name, request_args):
+        table = Table(cls=Event, label=u'event', columns=[
+            Column(attr='id', label=u'id', order_by='id.asc'),
+        ], sqlalchemy_session=fx_session)
+        table.add_filter(DateRange(Event, attribute_name, request_args,
+                                   now=lambda: now))
+        return [row[0].data for row in table.select(0, 20).rows]
+    # A date of `to` includes the day.
+    assert select('created_at', {'range.created_at.from': '2017-03-05',
+                                 'range.created_at.to': '2017-03-07'}) == \
+        [4, 5, 6]
+    assert select('created_at', {'range.created_at.preset': '7d'}) == \
+        [1, 2, 3, 4, 5, 6, 7]
+    assert select('day', {'range.day.from': '2017-03-08'}) == [1, 2, 3]
+    assert select('day', {'range.day.preset': '24h'}) == [1, 2]
+    with raises(BadRange):
+        select('day', {'range.day.to': 'yesterday'})
+    with raises(BadRange):
+        select('day', {'range.day.preset': '1y'})
+
+
+def test_numeric_range():
+    request_args = {'range.id.from': '3', 'range.id.to': '5'}
+    numeric_range = NumericRange(Music, 'id', request_args, type_=int)
+    assert numeric_range.bounds == (3, 5)
+    assert str(numeric_range.__query__()) == \
+        'music.id >= :id_1 AND music.id < :id_2'
+    assert NumericRange(Music, 'id', {}).__query__() is None
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_range_filter_html(environ):
+    request_args = {'range.created_at.from': '2017-03-05', 'limit': '10'}
+    soup = extract_soup(DateRange(Event, 'created_at', request_args))
+    inputs = soup.find_all('input')
+    assert [(i['name'], i['value']) for i in inputs] == [
+        ('range.created_at.from', '2017-03-05'),
+        ('range.created_at.to', ''),
+        ('limit', '10'),
+    ]
+    assert [li.text.strip() for li in soup.find_all('li')] == [
+        u'Last 24 hours', u'Last 7 days', u'Last 30 days',
+    ]
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_distinct_select_filter(environ, fx_session):
+    DistinctSelectFilter.cache.clear()
+    for name, t in [(u'a', u'x'), (u'b', u'y'), (u'c', u'x'), (u'd', u'z')]:
+        fx_session.add(Tag(name=name, t=t))
+    fx_session.commit()
+
+    def make_filter(request_args, **kwargs):
+        return DistinctSelectFilter(Tag, 't', request_args,
+                                    session=fx_session, **kwargs)
+    select_filter = make_filter({})
+    with QueryCounter(fx_session) as counter:
+        assert [c['name'] for c in select_filter.choices] == \
+            ['all', u'x', u'y', u'z']
+        assert [c['name'] for c in make_filter({}).choices] == \
+            ['all', u'x', u'y', u'z']
+    # Values are cached per model and attribute.
+    assert counter.count == 1
+    assert select_filter.__query__() is None
+    assert str(make_filter({'select.t': u'y'}).__query__()) == 'tag.t = :t_1'
+    with raises(BadChoice):
+        make_filter({'select.t': u'w'}).__query__()
+    assert not select_filter.truncated
+    assert extract_soup(select_filter).find('select')
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_distinct_select_filter_truncated(environ, fx_session):
+    DistinctSelectFilter.cache.clear()
+    for name in [u'ab', u'ac', u'b', u'c']:
+        fx_session.add(Tag(name=name, t=u'x'))
+    fx_session.commit()
+    lookup = fx_session.query(Tag.name, Tag.name + u'!').order_by(Tag.name)
+    select_filter = DistinctSelectFilter(Tag, 'name', {'select.name': u'c'},
+                                         lookup=lookup, max_choices=2)
+    assert select_filter.truncated
+    assert select_filter.choices[1:] == [
+        {'name': u'ab', 'description': u'ab!'},
+        {'name': u'ac', 'description': u'ac!'},
+    ]
+    # Values beyond the rendered ones can be selected.
+    assert select_filter.__query__() is not None
+    assert select_filter.search_choices(u'A', limit=1) == [(u'ab', u'ab!')]
+    soup = extract_soup(select_filter)
+    assert not soup.find('select')
+    assert soup.find('input', {'name': 'select.name'})['value'] == u'c'
+    assert [o['value'] for o in soup.find_all('option')] == [
+        'all', u'ab', u'ac',
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from mock import PropertyMock, patch
+from pytest import raises
+
+from .entities import Music
+from .helper import DodotableTestEnvironment
+from dodotable.counter import QueryCounter
+from dodotable.exc import QueryBudgetExceeded
+from dodotable.schema import Column, Table
+
+
+def test_query_counter(fx_session, fx_music):
+    with QueryCounter(fx_session) as counter:
+        fx_session.query(Music).all()
+        fx_session.query(Music).count()
+    assert counter.count == 2
+    fx_session.query(Music).all()
+    assert counter.count == 2
+
+
+def test_query_counter_budget(fx_session, fx_music):
+    with raises(QueryBudgetExceeded) as e:
+        with QueryCounter(fx_session, budget=1):
+            fx_session.query(Music).all()
+            fx_session.query(Music).count()
+    assert e.value.budget == 1
+    assert len(e.value.statements) == 2
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_queries_per_page(environ, fx_session, fx_music):
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.desc'),
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session)
+    # A page costs a query for rows and a query for the count.
+    with table.count_queries(budget=2):
+        table.select(offset=0, limit=10)
+        table.__html__()
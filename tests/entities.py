@@ -1,6 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import Column
-from sqlalchemy.types import Integer, Unicode
+from sqlalchemy.types import Date, DateTime, Integer, Unicode
 
 
 Base = declarative_base()
@@ -24,3 +24,16 @@ class Tag(Base):
     t = Column(Unicode, nullable=False)
 
     __tablename__ = 'tag'
+
+
+class Event(Base):
+
+    id = Column(Integer, primary_key=True)
+
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    day = Column(Date, nullable=False)
+
+    score = Column(Integer, nullable=True)
+
+    __tablename__ = 'event'
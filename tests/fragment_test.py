@@ -0,0 +1,65 @@
+import datetime
+
+from mock import PropertyMock, patch
+
+from .entities import Event
+from .helper import DodotableTestEnvironment, extract_soup
+from dodotable.fragment import CachedRow, RowFragmentCache
+from dodotable.schema import Column, Table
+from dodotable.singleflight import SingleFlight
+from dodotable.util import string_literal
+
+
+def make_table(session, row_cache, _repr=string_literal, **kwargs):
+    return Table(cls=Event, label=u'event', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='created_at', label=u'created at', _repr=_repr),
+    ], sqlalchemy_session=session, version_attr='created_at',
+        row_cache=row_cache, **kwargs)
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_row_fragment_cache(environ, fx_session):
+    created_at = datetime.datetime(2017, 3, 10)
+    for hours in range(3):
+        at = created_at + datetime.timedelta(hours=hours)
+        fx_session.add(Event(created_at=at, day=at.date()))
+    fx_session.commit()
+    row_cache = RowFragmentCache()
+    table = make_table(fx_session, row_cache).select(offset=0, limit=2)
+    assert all(isinstance(row, CachedRow) for row in table.rows)
+    assert [row.row[0].data for row in table.rows] == [1, 2]
+    assert table.version == created_at + datetime.timedelta(hours=1)
+    assert table.next_cursor is not None
+    html = table.__html__()
+    assert len(row_cache) == 2
+    # Cached rows are neither loaded nor rendered again.
+    table = make_table(fx_session, row_cache)
+    with table.count_queries() as counter:
+        table.select(offset=0, limit=2)
+    assert counter.count == 2
+    assert all(row.row is None for row in table.rows)
+    assert table.__html__() == html
+    assert [r[0] for r in table.__json__()['rows']] == [1, 2]
+    # A changed row is built again.
+    event = fx_session.query(Event).filter_by(id=2).one()
+    event.created_at = created_at + datetime.timedelta(days=1)
+    fx_session.commit()
+    table = make_table(fx_session, row_cache).select(offset=0, limit=2)
+    assert [row.row is None for row in table.rows] == [True, False]
+    soup = extract_soup(table)
+    assert u'2017-03-11' in soup.find_all('tr')[2].text
+    # Rows of a table whose columns render differently aren't shared.
+    table = make_table(fx_session, row_cache,
+                       _repr=lambda data: data.strftime('%Y/%m/%d'))
+    table.select(offset=0, limit=2)
+    assert all(row.row is not None for row in table.rows)
+    assert u'2017/03/11' in extract_soup(table).find_all('tr')[2].text
+    # Rows of pages selected by singleflight are cached as well.
+    table = make_table(fx_session, row_cache, singleflight=SingleFlight())
+    table.select(offset=0, limit=2)
+    assert all(isinstance(row, CachedRow) for row in table.rows)
+    assert [row.row is None for row in table.rows] == [True, True]
+    assert table.__html__() == make_table(fx_session, row_cache) \
+        .select(offset=0, limit=2).__html__()
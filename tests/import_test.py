@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from pytest import mark
+
+
+#: (:class:`int`) The budget of ``import dodotable.schema`` in microseconds,
+#: not counting SQLAlchemy and six which are imported beforehand.  It takes
+#: about 20ms, and importing Flask alone takes about 100ms.  Timings vary
+#: on loaded machines, so it's checked only if
+#: ``DODOTABLE_IMPORT_TIME_BUDGET`` is set, e.g. to 75000.
+IMPORT_TIME_BUDGET = os.environ.get('DODOTABLE_IMPORT_TIME_BUDGET')
+
+#: (:class:`str`) Dependencies imported before measuring, so their import
+#: time doesn't hide dodotable's.
+PRELOAD = 'import six, sqlalchemy, sqlalchemy.orm; '
+
+
+def import_times(statement):
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.STDOUT
+    ).decode('utf-8')
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@mark.skipif(sys.version_info < (3, 7), reason='-X importtime is 3.7+')
+def test_import_schema():
+    times = import_times(PRELOAD + 'import dodotable.schema, '
+                         'dodotable.condition, dodotable.helper')
+    assert 'flask' not in times
+    assert 'jinja2' not in times
+    if IMPORT_TIME_BUDGET:
+        assert times['dodotable.schema'] < int(IMPORT_TIME_BUDGET)
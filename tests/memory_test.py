@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import collections
+
+from mock import PropertyMock, patch
+
+from .helper import DodotableTestEnvironment, extract_soup
+from dodotable.condition import (Ilike, IlikeSet, NullSelectableSelectFilter,
+                                 SelectFilter, create_search_name)
+from dodotable.memory import MemorySource
+from dodotable.schema import Column, Table
+
+
+Package = collections.namedtuple('Package', ['id', 'name', 'license'])
+
+PACKAGES = [
+    Package(1, u'Flask', u'BSD'),
+    Package(2, u'requests', u'Apache'),
+    Package(3, u'six', u'MIT'),
+    Package(4, u'SQLAlchemy', u'MIT'),
+    Package(5, u'flake8', u'MIT'),
+    Package(6, u'private', None),
+]
+
+
+def make_table(source, order_by, request_args):
+    return Table(cls=source, label=u'package', columns=[
+        Column(attr='id', label=u'id', order_by=order_by),
+        Column(attr='name', label=u'name', order_by=order_by,
+               filters=[Ilike(source, 'name', request_args)]),
+        Column(attr='license', label=u'license', order_by=order_by),
+    ])
+
+
+def ids(table):
+    return [row[0].data for row in table.rows]
+
+
+def test_memory_order_and_page():
+    source = MemorySource(PACKAGES)
+    assert source.__name__ == 'Package'
+    table = make_table(source, 'license.desc,name.asc', {})
+    table.select(offset=0, limit=3)
+    assert ids(table) == [4, 5, 3]
+    assert table.count == 6
+    table.select(offset=3, limit=3)
+    # NULL comes last in descending order.
+    assert ids(table) == [1, 2, 6]
+    table = make_table(source, None, {})
+    assert ids(table.select(offset=1, limit=2)) == [5, 4]
+
+
+def test_memory_keyset():
+    source = MemorySource(PACKAGES)
+    table = make_table(source, 'id.asc', {})
+    table.select(offset=0, limit=4)
+    assert ids(table) == [1, 2, 3, 4]
+    table.select(limit=4, after=table.next_cursor)
+    assert ids(table) == [5, 6]
+    # NULL sort keys are sought as well.
+    table = make_table(source, 'license.desc,name.asc', {})
+    table.select(offset=0, limit=4)
+    assert ids(table) == [4, 5, 3, 1]
+    table.select(limit=4, after=table.next_cursor)
+    assert ids(table) == [2, 6]
+    assert table.pager.offset == 4
+
+
+def test_memory_keyset_ties():
+    source = MemorySource(PACKAGES)
+    table = make_table(source, 'license.desc', {})
+    expected = ids(table.select(offset=0, limit=10))
+    assert expected == [3, 4, 5, 1, 2, 6]
+    # Tied records are told apart by their positions.
+    walked = ids(table.select(offset=0, limit=2))
+    while table.next_cursor is not None:
+        walked.extend(ids(table.select(limit=2, after=table.next_cursor)))
+    assert walked == expected
+
+
+def test_memory_filters():
+    source = MemorySource(PACKAGES)
+    name = create_search_name('package')
+    request_args = {name['type']: 'name', name['word']: u'FL',
+                    'select.license': u'MIT'}
+    table = make_table(source, 'id.asc', request_args)
+    table.add_filter(IlikeSet(table, request_args))
+    table.add_filter(SelectFilter(source, 'license', [
+        {'name': u'MIT', 'description': u'MIT'},
+        {'name': u'BSD', 'description': u'BSD'},
+    ], request_args))
+    assert ids(table.select(offset=0, limit=10)) == [5]
+    assert table.count == 1
+    assert table.count_facets() == {
+        'license': {'all': 2, u'MIT': 1, u'BSD': 1},
+    }
+
+
+def test_memory_null_filter():
+    source = MemorySource(PACKAGES)
+    table = make_table(source, 'id.asc', {})
+    null = NullSelectableSelectFilter.NULL
+    table.add_filter(NullSelectableSelectFilter(
+        source, 'license', [{'name': null, 'description': null}],
+        {'select.license': null}
+    ))
+    assert ids(table.select(offset=0, limit=10)) == [6]
+
+
+def test_memory_like():
+    source = MemorySource(PACKAGES)
+    query = source.query()
+    assert [p.id for p in query.filter(source.name.like(u'f_a%'))] == [5]
+    assert [p.id for p in query.filter(source.name.ilike(u'f_a%'))] == [1, 5]
+    assert [p.id for p in query.filter(source.id >= 5)] == [5, 6]
+    assert [p.id for p in query.filter(source.license != u'MIT')] == [1, 2]
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_memory_html(environ):
+    table = make_table(MemorySource(PACKAGES), 'id.asc', {})
+    soup = extract_soup(table.select(offset=0, limit=2))
+    assert [td.text.strip() for td in soup.find_all('td')][:3] == [
+        u'1', u'Flask', u'BSD',
+    ]
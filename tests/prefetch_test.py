@@ -0,0 +1,78 @@
+import time
+
+from mock import PropertyMock, patch
+
+from .entities import Music
+from .helper import DodotableTestEnvironment
+from dodotable.prefetch import Prefetcher
+from dodotable.schema import Column, Table
+from dodotable.util import query_key
+
+
+def make_table(session, prefetcher):
+    return Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=session, prefetcher=prefetcher)
+
+
+def wait_for(prefetcher, key):
+    for _ in range(500):
+        if key in prefetcher.cache:
+            return
+        time.sleep(0.01)
+    raise AssertionError('{!r} is not prefetched'.format(key))
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_prefetch_next_page(environ, fx_session):
+    for name in [u'a', u'b', u'c', u'd', u'e']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    prefetcher = Prefetcher(maxsize=4, ttl=60)
+    make_table(fx_session, prefetcher).select(offset=0, limit=2)
+    wait_for(prefetcher, Prefetcher.key(make_table(fx_session, None), 2, 2))
+    # The second page is served from the prefetched one.
+    fx_session.query(Music).filter(Music.name.in_([u'c', u'd'])).delete(
+        synchronize_session=False
+    )
+    fx_session.commit()
+    table = make_table(fx_session, prefetcher).select(offset=2, limit=2)
+    assert [row[1].data for row in table.rows] == [u'c', u'd']
+    assert table.pager.count == 5
+    # It's taken out of the cache.
+    table = make_table(fx_session, prefetcher).select(offset=2, limit=2)
+    assert [row[1].data for row in table.rows] == [u'e']
+    # Don't leave the prefetch of the next page running.
+    prefetcher.take(Prefetcher.key(table, 4, 2), timeout=5)
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_prefetch_last_page(environ, fx_session, fx_music):
+    prefetcher = Prefetcher()
+    table = make_table(fx_session, prefetcher).select(offset=0, limit=2)
+    assert [row[1].data for row in table.rows] == [fx_music.name]
+    assert not prefetcher._in_flight
+    assert not len(prefetcher.cache)
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_prefetch_columns(environ, fx_session):
+    for name in [u'a', u'b', u'c', u'd']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    prefetcher = Prefetcher(maxsize=4, ttl=60)
+    make_table(fx_session, prefetcher).select(offset=0, limit=2)
+    wait_for(prefetcher, Prefetcher.key(make_table(fx_session, None), 2, 2))
+    # A table of the same query but other columns doesn't take the page.
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+    ], sqlalchemy_session=fx_session, prefetcher=prefetcher)
+    assert query_key(table.query) == \
+        query_key(make_table(fx_session, None).query)
+    table.select(offset=2, limit=2)
+    assert [[cell.data for cell in row] for row in table.rows] == [[3], [4]]
+    assert len(prefetcher.cache) == 1
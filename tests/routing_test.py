@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from pytest import yield_fixture
+from sqlalchemy import text
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .entities import Base, Music
+from .helper import DodotableTestEnvironment
+from dodotable.condition import DistinctSelectFilter
+from dodotable.routing import PrimaryOnlyPolicy
+from dodotable.schema import Column, Table
+
+
+@yield_fixture
+def fx_engines(tmpdir):
+    engines = []
+    for name in 'primary', 'replica':
+        path = tmpdir.join('{}.db'.format(name))
+        engine = create_engine('sqlite:///{}'.format(path))
+        Base.metadata.create_all(bind=engine)
+        session = Session(bind=engine)
+        session.add(Music(name=name))
+        session.commit()
+        session.close()
+        engines.append(engine)
+    try:
+        yield engines
+    finally:
+        for engine in engines:
+            engine.dispose()
+
+
+def make_table(environment, session):
+    class RoutedTable(Table):
+        pass
+    RoutedTable.environment = environment
+    return RoutedTable(cls=Music, label=u'music', columns=[
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=session)
+
+
+def test_read_session(fx_engines):
+    primary, replica = fx_engines
+    environment = DodotableTestEnvironment(
+        read_session_factory=sessionmaker(bind=replica)
+    )
+    session = Session(bind=primary)
+    tables = [make_table(environment, session) for _ in range(2)]
+    try:
+        with environment.read_session_scope():
+            for table in tables:
+                table.select(offset=0, limit=10)
+                assert [row[0].data for row in table.rows] == [u'replica']
+                assert table.count == 1
+            # Tables of a request share the read session.
+            read_session = environment.get_read_session()
+            assert all(t.session_for('count') is read_session
+                       for t in tables)
+            assert tables[0].session_for('write') is session
+    finally:
+        session.close()
+    # The scope released the read session.
+    assert not read_session.in_transaction()
+    assert getattr(environment._local, 'read_session', None) is None
+    assert environment.get_read_session() is None
+    assert tables[0].session_for('count') is session
+
+
+def test_read_session_scope(fx_engines):
+    _, replica = fx_engines
+    environment = DodotableTestEnvironment(
+        read_session_factory=sessionmaker(bind=replica)
+    )
+    with environment.read_session_scope():
+        read_session = environment.get_read_session()
+        with environment.read_session_scope():
+            assert environment.get_read_session() is read_session
+        # Only the outermost scope closes the session.
+        assert environment.get_read_session() is read_session
+    assert getattr(environment._local, 'read_session', None) is None
+    # Sessions opened in other threads are closed as well.
+    sessions = []
+
+    def job():
+        sessions.append(environment.get_read_session())
+        sessions[0].execute(text('SELECT 1'))
+    thread = threading.Thread(target=environment.copy_context(job))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not None
+    assert not sessions[0].in_transaction()
+
+
+def test_routing_policy(fx_engines):
+    primary, replica = fx_engines
+    environment = DodotableTestEnvironment(
+        read_session_factory=sessionmaker(bind=replica),
+        routing_policy=PrimaryOnlyPolicy()
+    )
+    session = Session(bind=primary)
+    try:
+        with environment.read_session_scope():
+            table = make_table(environment, session).select(offset=0,
+                                                            limit=10)
+            assert [row[0].data for row in table.rows] == [u'primary']
+    finally:
+        session.close()
+
+
+def test_no_read_session(fx_engines):
+    primary, _ = fx_engines
+    environment = DodotableTestEnvironment()
+    session = Session(bind=primary)
+    try:
+        table = make_table(environment, session).select(offset=0, limit=10)
+        assert [row[0].data for row in table.rows] == [u'primary']
+        assert table.session_for('count') is session
+    finally:
+        session.close()
+
+
+def test_distinct_select_filter_session(fx_engines):
+    primary, replica = fx_engines
+    environment = DodotableTestEnvironment(
+        read_session_factory=sessionmaker(bind=replica)
+    )
+    DistinctSelectFilter.cache.clear()
+    session = Session(bind=primary)
+    try:
+        with environment.read_session_scope():
+            select_filter = DistinctSelectFilter(Music, 'name', {})
+            select_filter.environment = environment
+            assert [c['name'] for c in select_filter.choices] == \
+                ['all', u'replica']
+            # Choices of another database aren't shared by the cache.
+            select_filter = DistinctSelectFilter(Music, 'name', {},
+                                                 session=session)
+            assert [c['name'] for c in select_filter.choices] == \
+                ['all', u'primary']
+    finally:
+        session.close()
@@ -1,11 +1,26 @@
 # -*- coding: utf-8 -*-
+import datetime
+import json
 import re
+import threading
+import warnings
 
+from flask import Flask, request
 from mock import PropertyMock, patch
+from pytest import mark, raises
 
-from .entities import Music
+from .entities import Event, Music, Tag
 from .helper import DodotableTestEnvironment, extract_soup
-from dodotable.schema import Cell, Column, Pager, Row, Table
+from dodotable.condition import (Ilike, IlikeSet, Keyset, Order,
+                                 SelectFilter, create_search_name)
+from dodotable.counter import QueryCounter
+from dodotable.environment.flask import FlaskEnvironment
+from dodotable.exc import BadCursor, UnindexedOrderWarning
+from dodotable.helper import Category, Limit
+from dodotable.schema import (Cell, Column, LinkedColumn, Pager, Row,
+                              StreamedRows, Table, TableDefinition,
+                              TableGroup)
+from dodotable.util import camel_to_underscore, to_json
 
 
 def test_cell():
@@ -138,3 +153,482 @@ def test_pager():
     pager = Pager(count=1000, limit=10, offset=90)
     p = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 100]
     assert pager.pages == list(to_page(p, 10))
+
+
+class UrlCacheTestEnvironment(DodotableTestEnvironment):
+
+    def __init__(self, *args, **kwargs):
+        super(UrlCacheTestEnvironment, self).__init__(*args, **kwargs)
+        self.url_cache = {}
+
+    def get_url_cache(self):
+        return self.url_cache
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=UrlCacheTestEnvironment())
+def test_linked_column_lazy_endpoint(environ, fx_session, fx_music):
+    calls = []
+
+    def endpoint(music):
+        calls.append(music)
+        return '/musics/{}/'.format(music.id)
+    table = Table(cls=Music, label='hello', columns=[
+        LinkedColumn(label=u'name', attr='name', endpoint=endpoint),
+    ], sqlalchemy_session=fx_session)
+    table.select()
+    # Selecting doesn't compute urls.
+    assert not calls
+    table.select()
+    cells = [row[0] for row in table.rows]
+    cells.extend(row[0] for row in table.select().rows)
+    assert all(c.url == '/musics/{}/'.format(fx_music.id) for c in cells)
+    # The same target is resolved once per request.
+    assert calls == [fx_music]
+    soup = extract_soup(table)
+    assert soup.find('a', href='/musics/{}/'.format(fx_music.id))
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_group(environ, fx_session, fx_music, fx_tags):
+    music_table = Table(cls=Music, label=u'musics', columns=[
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session)
+    tag_table = Table(cls=Tag, label=u'tags', columns=[
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session)
+    with TableGroup([music_table]).add(tag_table, limit=1) as group:
+        group.select()
+        assert music_table.session is not fx_session
+        assert music_table.session is not tag_table.session
+        assert [r[0].data for r in music_table.rows] == [fx_music.name]
+        assert len(tag_table.rows) == 1
+        assert tag_table.pager.count == 2
+        soup = extract_soup(group)
+    assert music_table.session is fx_session
+    assert tag_table.session is fx_session
+    tables = soup.find_all('div', class_='table-wrap')
+    assert len(tables) == 2
+    assert tables[0].find('td', text=re.compile(re.escape(fx_music.name)))
+
+
+class RecordingTable(Table):
+
+    def __init__(self, *args, **kwargs):
+        self.error = kwargs.pop('error', None)
+        self.paths = kwargs.pop('paths')
+        super(RecordingTable, self).__init__(*args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        self.paths.append((request.path, threading.current_thread()))
+        if self.error is not None:
+            raise self.error
+        return super(RecordingTable, self).select(*args, **kwargs)
+
+
+def test_table_group_context_and_errors(fx_session, fx_music):
+    environment = FlaskEnvironment()
+    app = Flask(__name__)
+    paths = []
+
+    def make_table(error=None):
+        return RecordingTable(cls=Music, label=u'musics', columns=[
+            Column(attr='name', label=u'name'),
+        ], sqlalchemy_session=fx_session, paths=paths, error=error)
+    with patch('dodotable.schema.Schema.environment',
+               new_callable=PropertyMock, return_value=environment), \
+            patch('dodotable.schema.logger') as logger, \
+            app.test_request_context('/musics/'):
+        tables = [make_table() for _ in range(4)]
+        group = TableGroup(tables, max_workers=2)
+        with group:
+            group.select()
+        # Tables are selected in the request context by at most 2 threads.
+        assert [path for path, _ in paths] == ['/musics/'] * 4
+        assert len(set(thread for _, thread in paths)) <= 2
+        errors = [ValueError('a'), ValueError('b')]
+        group = TableGroup([make_table(e) for e in errors] + [make_table()],
+                           max_workers=1)
+        with raises(ValueError) as e, group:
+            group.select()
+        assert e.value is errors[0]
+        assert logger.error.call_count == 1
+        assert logger.error.call_args[1]['exc_info'][1] is errors[1]
+
+
+def test_table_keyset_pagination(fx_session):
+    for name in [u'c', u'a', u'b', u'a', u'c']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    expected = [(m.name, m.id) for m in
+                fx_session.query(Music).order_by(Music.name, Music.id)]
+
+    def make_table():
+        return Table(cls=Music, label=u'music', columns=[
+            Column(attr='name', label=u'name', order_by='name.asc'),
+            Column(attr='id', label=u'id'),
+        ], sqlalchemy_session=fx_session)
+    table = make_table().select(limit=2)
+    pages = [[tuple(c.data for c in row) for row in table.rows]]
+    while table.next_cursor:
+        table = make_table().select(limit=2, after=table.next_cursor)
+        pages.append([tuple(c.data for c in row) for row in table.rows])
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == expected
+
+
+def test_table_keyset_lazy_offset(fx_session):
+    for name in [u'c', u'a', u'b', u'a', u'c']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+
+    def make_table():
+        return Table(cls=Music, label=u'music', columns=[
+            Column(attr='name', label=u'name', order_by='name.asc'),
+            Column(attr='id', label=u'id'),
+        ], sqlalchemy_session=fx_session)
+    cursor = make_table().select(limit=2).next_cursor
+    table = make_table()
+    with QueryCounter(fx_session) as counter:
+        table.select(limit=2, after=cursor)
+        list(table.rows)
+    selected = counter.count
+    # Rows before the cursor are counted only when the offset is read.
+    with QueryCounter(fx_session) as counter:
+        assert table.pager.offset == 2
+        assert table.pager.offset == 2
+    assert counter.count == 1
+    assert selected == 2
+
+
+@mark.parametrize('order', ['asc', 'desc'])
+def test_table_keyset_pagination_nulls(fx_session, order):
+    created_at = datetime.datetime(2017, 3, 10)
+    for score in [2, None, 1, None, 2, 3, None]:
+        fx_session.add(Event(created_at=created_at, day=created_at.date(),
+                             score=score))
+    fx_session.commit()
+    key = Event.score.asc() if order == 'asc' else Event.score.desc()
+    expected = [e.id for e in
+                fx_session.query(Event).order_by(key, Event.id)]
+
+    def make_table():
+        return Table(cls=Event, label=u'event', columns=[
+            Column(attr='score', label=u'score',
+                   order_by='score.' + order),
+            Column(attr='id', label=u'id'),
+        ], sqlalchemy_session=fx_session)
+    table = make_table().select(limit=2)
+    pages = [[row[1].data for row in table.rows]]
+    offsets = [table.pager.offset]
+    while table.next_cursor:
+        table = make_table().select(limit=2, after=table.next_cursor)
+        pages.append([row[1].data for row in table.rows])
+        offsets.append(table.pager.offset)
+    assert sum(pages, []) == expected
+    assert offsets[:4] == [0, 2, 4, 6]
+
+
+def test_keyset_nulls_last():
+    orders = [Order(Event, 'score', 'asc'), Order(Event, 'id', 'asc')]
+    assert str(Keyset(orders, [1, 2], nulls_first=False).__query__()) == (
+        'event.score > :score_1 OR event.score IS NULL OR '
+        'event.score = :score_2 AND event.id > :id_1'
+    )
+    assert str(Keyset(orders, [None, 2], nulls_first=False).__query__()) \
+        == 'event.score IS NULL AND event.id > :id_1'
+
+
+def test_table_json(fx_session):
+    for name in [u'a', u'b', u'c']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session, version_attr='id')
+    data = json.loads(to_json(table.select(offset=0, limit=2)))
+    assert [c['attr'] for c in data['columns']] == ['id', 'name']
+    assert [r[1] for r in data['rows']] == [u'a', u'b']
+    assert data['pager']['count'] == 3
+    assert data['next_cursor'] == table.next_cursor
+    assert data['version'] == data['rows'][-1][0]
+    # Only rows changed since the version.
+    table.select(offset=0, limit=2, since=data['version'])
+    data = table.__json__()
+    assert [r[1] for r in data['rows']] == [u'c']
+    assert data['pager']['count'] == 1
+    assert data['next_cursor'] is None
+
+
+def test_table_since_string(fx_session):
+    for day in [9, 10, 11]:
+        created_at = datetime.datetime(2017, 3, day, 12)
+        fx_session.add(Event(created_at=created_at, day=created_at.date()))
+    fx_session.commit()
+
+    def make_table(version_attr):
+        return Table(cls=Event, label=u'event', columns=[
+            Column(attr='id', label=u'id', order_by='id.asc'),
+        ], sqlalchemy_session=fx_session, version_attr=version_attr)
+    table = make_table('created_at').select(since='2017-03-10 00:00:00')
+    assert [row[0].data for row in table.rows] == [2, 3]
+    assert table.since == datetime.datetime(2017, 3, 10)
+    table = make_table('day').select(since='2017-03-10')
+    assert [row[0].data for row in table.rows] == [3]
+    table = make_table('id').select(since='1')
+    assert [row[0].data for row in table.rows] == [2, 3]
+    with raises(BadCursor):
+        make_table('created_at').select(since='yesterday')
+    with raises(BadCursor):
+        make_table('id').select(since='one')
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_classifies_filters(environ, fx_session, fx_tags):
+    table = Table(cls=Tag, label=u'tags', columns=[
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session)
+    category = Category(Tag, 't', [{'name': 'genre', 'description': u'g'}],
+                        {})
+    limit = Limit(table, {})
+    ilike_set = IlikeSet(table, {})
+    for f in category, limit, ilike_set:
+        table.add_filter(f)
+    assert table.categories == [category]
+    assert table.limits == [limit]
+    assert table.helpers == [category, limit]
+    assert table.widgets == [ilike_set]
+    soup = extract_soup(table.select())
+    assert soup.find('div', class_='table-categories').find('ul', class_='t')
+    assert soup.find('div', class_='table-filters').find('form')
+    assert soup.find('div', class_='limit-view').find('select')
+
+
+def test_environment_isinstance():
+    environment = DodotableTestEnvironment()
+    assert environment.isinstance(Cell(0, 0, 1), 'dodotable.schema:Cell')
+    assert environment.isinstance(Cell(0, 0, 1), 'dodotable.schema:Cell')
+    assert not environment.isinstance(Cell(0, 0, 1), 'dodotable.schema:Row')
+    assert not environment.isinstance(Cell(0, 0, 1), 'nonexistent:Cell')
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_streamed_rows(environ, fx_session):
+    for name in [u'a', u'b', u'c', u'd', u'e']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='name', label=u'name'),
+    ], sqlalchemy_session=fx_session)
+    with table.count_queries() as counter:
+        table.select(offset=0, limit=4, batch_size=2)
+    # Only the count is issued until rows are consumed.
+    assert counter.count == 1
+    assert isinstance(table.rows, StreamedRows)
+    soup = extract_soup(table)
+    assert [td.text.strip() for td in soup.select('tbody td:nth-of-type(2)')
+            ] == [u'a', u'b', u'c', u'd']
+    assert table.next_cursor
+    assert not Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id'),
+    ], sqlalchemy_session=fx_session).select(offset=10, batch_size=2).rows
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_snapshot(environ, fx_session, fx_tags):
+    table = Table(cls=Tag, label=u'tags', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='name', label=u'name', visible=False),
+    ], sqlalchemy_session=fx_session)
+    table.select()
+    snapshot = table.snapshot
+    assert snapshot.count == 2
+    assert snapshot.pager is table.pager
+    assert [c.attr for c in snapshot.columns] == ['id']
+    assert table.columns is snapshot.columns
+    assert table._orders is snapshot.orders
+    assert table.pager.pages is table.pager.pages
+    with table.count_queries(budget=0):
+        assert table.count == 2
+        extract_soup(table)
+    table.add_filter(SelectFilter(Tag, 't', [], {'select.t': 'all'}))
+    assert table.snapshot is None
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_definition(environ, fx_session, fx_tags):
+    genre, country = fx_tags
+    definition = TableDefinition(Tag, u'tags', columns=[
+        Column(attr='id', label=u'id', order_by='id.desc'),
+        Column(attr='name', label=u'name', filters=[Ilike(Tag, 'name', {})]),
+    ], filters=[
+        lambda table, request_args: IlikeSet(table, request_args),
+    ])
+    search_name = create_search_name(camel_to_underscore(Tag.__name__))
+    searched = definition.bind(fx_session, {
+        search_name['type']: 'name',
+        search_name['word']: genre.name,
+    }).select()
+    assert [row[1].data for row in searched.rows] == [genre.name]
+    table = definition.bind(fx_session).select()
+    assert [row[0].data for row in table.rows] == [country.id, genre.id]
+    table = definition.bind(fx_session, {'order_by': 'id.asc'}).select()
+    assert [row[0].data for row in table.rows] == [genre.id, country.id]
+    # The definition isn't changed by requests.
+    assert definition.columns[0].order_by == 'desc'
+    assert definition.columns[1].filters[0].request_args == {}
+
+
+def test_table_order_priority(fx_session):
+    for name in [u'b', u'a', u'b', u'a']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    order_by = 'name.asc,id.desc'
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by=order_by),
+        Column(attr='name', label=u'name', order_by=order_by),
+    ], sqlalchemy_session=fx_session)
+    assert [o.attribute_name for o in table._orders] == ['name', 'id']
+    expected = [(m.id, m.name) for m in fx_session.query(Music).order_by(
+        Music.name.asc(), Music.id.desc()
+    )]
+    assert [(r[0].data, r[1].data) for r in table.select().rows] == expected
+
+
+def test_table_primary_key_tiebreaker(fx_session):
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='name', label=u'name', order_by='name.asc'),
+    ], sqlalchemy_session=fx_session)
+    assert [(o.attribute_name, o.order) for o in table._orders] == [
+        ('name', 'asc'), ('id', 'asc'),
+    ]
+
+
+def test_table_warn_unindexed_order(fx_session):
+    def make_table(order_by):
+        return Table(cls=Music, label=u'music', columns=[
+            Column(attr='id', label=u'id', order_by=order_by),
+            Column(attr='name', label=u'name', order_by=order_by),
+        ], sqlalchemy_session=fx_session, warn_unindexed_order=True)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        make_table('id.desc')._orders
+        assert not w
+        make_table('name.asc')._orders
+        assert len(w) == 1
+        assert issubclass(w[0].category, UnindexedOrderWarning)
+
+
+def make_event_table(session):
+    return Table(cls=Event, label=u'event', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+    ], sqlalchemy_session=session, version_attr='created_at')
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_etag(environ, fx_session):
+    created_at = datetime.datetime(2017, 3, 10)
+    fx_session.add(Event(created_at=created_at, day=created_at.date()))
+    fx_session.commit()
+    table = make_event_table(fx_session)
+    assert table.data_version() == (created_at, 1)
+    etag = table.etag(0, 10)
+    with table.count_queries() as counter:
+        assert make_event_table(fx_session).etag(0, 10) == etag
+    # The greatest version and the count, without selecting rows.
+    assert counter.count == 1
+    assert table.etag(10, 10) != etag
+
+    def make_table(**kwargs):
+        return Table(cls=Event, label=u'event', columns=[
+            Column(attr='id', order_by='id.asc', **kwargs),
+        ], sqlalchemy_session=fx_session, version_attr='created_at')
+    # How columns are rendered is a part of the tag as well.
+    assert make_table(label=u'id').etag(0, 10) == etag
+    assert make_table(label=u'ID').etag(0, 10) != etag
+    assert make_table(label=u'id', _repr=repr).etag(0, 10) != etag
+    assert make_table(label=u'id', classes=('n',)).etag(0, 10) != etag
+    later = created_at + datetime.timedelta(hours=1)
+    fx_session.add(Event(created_at=later, day=later.date()))
+    fx_session.commit()
+    assert table.etag(0, 10) != etag
+    with raises(ValueError):
+        Table(cls=Music, label=u'music', sqlalchemy_session=fx_session).etag()
+
+
+def test_flask_conditional_response(fx_session):
+    created_at = datetime.datetime(2017, 3, 10)
+    fx_session.add(Event(created_at=created_at, day=created_at.date()))
+    fx_session.commit()
+    environment = FlaskEnvironment()
+    app = Flask(__name__)
+    renders = []
+
+    @app.route('/')
+    def index():
+        def render(table):
+            renders.append(table)
+            return table.__html__()
+        return environment.conditional_response(
+            make_event_table(fx_session), render, 0, 10
+        )
+    with patch('dodotable.schema.Schema.environment',
+               new_callable=PropertyMock, return_value=environment):
+        client = app.test_client()
+        response = client.get('/')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        response = client.get('/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        response = client.get('/', headers={'If-None-Match': 'W/' + etag})
+        assert response.status_code == 304
+        assert len(renders) == 1
+        assert 'conditional_response' not in environment.__dict__()
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_column_preview(environ, fx_session):
+    fx_session.add(Music(name=u'a long name of music'))
+    fx_session.add(Music(name=u'short'))
+    fx_session.commit()
+    fx_session.expunge_all()
+    table = Table(cls=Music, label=u'music', columns=[
+        Column(attr='id', label=u'id', order_by='id.asc'),
+        Column(attr='name', label=u'name', preview=6),
+    ], sqlalchemy_session=fx_session)
+    with table.count_queries() as counter:
+        table.select(offset=0, limit=10)
+        soup = extract_soup(table)
+    # The full text isn't loaded while it's rendered.
+    assert counter.count == 2
+    assert 'substr' in counter.statements[0].lower()
+    previews = [row[1].data for row in table.rows]
+    assert previews == [u'a long', u'short']
+    assert [p.truncated for p in previews] == [True, False]
+    assert [td.text.strip() for td in soup.find_all('td')[1::2]] == [
+        u'a long…', u'short',
+    ]
+    # Full texts are queried by the primary key, even of detached records.
+    fx_session.expunge_all()
+    assert previews[0].load() == u'a long name of music'
+    assert previews[1].load() == u'short'
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_count_without_select(environ, fx_session, fx_tags):
+    table = Table(cls=Tag, label=u'tag', columns=[
+        Column(attr='id', label=u'id'),
+    ], sqlalchemy_session=fx_session)
+    soup = extract_soup(table)
+    assert '2' in soup.find('div', class_='table-information').text
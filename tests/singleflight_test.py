@@ -0,0 +1,138 @@
+import threading
+import time
+
+from mock import PropertyMock, patch
+from pytest import raises
+from six import text_type
+from sqlalchemy.orm import Session, object_session
+
+from .entities import Music
+from .helper import DodotableTestEnvironment
+from dodotable.exc import SingleFlightTimeout
+from dodotable.schema import Column, LinkedColumn, Table
+from dodotable.singleflight import SingleFlight
+
+
+def run_concurrently(n, target):
+    results = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def join(threads):
+    for thread in threads:
+        thread.join()
+
+
+def test_singleflight_shares_result():
+    singleflight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        release.wait(5)
+        return object()
+    threads, results = run_concurrently(
+        4, lambda: singleflight.do('key', function)
+    )
+    time.sleep(0.1)
+    assert singleflight.in_flight() == 1
+    release.set()
+    join(threads)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert not singleflight.in_flight()
+    # Calls after the flight call again.
+    singleflight.do('key', function)
+    assert len(calls) == 2
+
+
+def test_singleflight_error():
+    singleflight = SingleFlight()
+    release = threading.Event()
+
+    def function():
+        release.wait(5)
+        raise ValueError('failed')
+    threads, results = run_concurrently(
+        3, lambda: singleflight.do('key', function)
+    )
+    time.sleep(0.1)
+    release.set()
+    join(threads)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not singleflight.in_flight()
+
+
+def test_singleflight_timeout():
+    singleflight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    threads, _ = run_concurrently(
+        1, lambda: singleflight.do('key', lambda: release.wait(5))
+    )
+    time.sleep(0.05)
+    with raises(SingleFlightTimeout):
+        singleflight.do('key', lambda: None)
+    release.set()
+    join(threads)
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_singleflight(environ, fx_session):
+    for name in [u'a', u'b', u'c']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    singleflight = SingleFlight(timeout=5)
+    release = threading.Event()
+    fetch_results = Table._fetch_results
+    calls = []
+    sessions = []
+
+    def blocking_fetch_results(self, *args):
+        calls.append(1)
+        release.wait(5)
+        return fetch_results(self, *args)
+
+    def make_select(_repr):
+        def select():
+            session = Session(bind=fx_session.get_bind())
+            sessions.append(session)
+            table = Table(cls=Music, label=u'music', columns=[
+                LinkedColumn(attr='id', label=u'id', order_by='id.asc',
+                             endpoint=lambda music: '/{}'.format(music.id)),
+                Column(attr='name', label=u'name', _repr=_repr),
+            ], sqlalchemy_session=session, singleflight=singleflight)
+            return table.select(offset=0, limit=2)
+        return select
+    try:
+        with patch.object(Table, '_fetch_results', blocking_fetch_results):
+            threads, tables = run_concurrently(3, make_select(text_type))
+            upper_threads, upper_tables = run_concurrently(
+                1, make_select(lambda data: text_type(data).upper())
+            )
+            time.sleep(0.1)
+            release.set()
+            join(threads + upper_threads)
+        assert len(calls) == 1
+        for table in tables + upper_tables:
+            assert [row[1].data for row in table.rows] == [u'a', u'b']
+            assert table.pager.count == 3
+            # Rows are built by each select, of records in its session.
+            assert all(object_session(row[0].target) is table.session
+                       for row in table.rows)
+        assert tables[0].rows is not tables[1].rows
+        assert [row[1].repr(row[1].data) for row in upper_tables[0].rows] \
+            == [u'A', u'B']
+    finally:
+        for session in sessions:
+            session.close()
@@ -0,0 +1,123 @@
+import datetime
+
+from mock import PropertyMock, patch
+from pytest import fixture
+
+from .entities import Event, Music
+from .helper import DodotableTestEnvironment
+from dodotable.condition import SelectFilter
+from dodotable.counter import QueryCounter
+from dodotable.schema import Column, Table
+from dodotable.totals import TotalCounter
+
+
+@fixture
+def fx_total_counter():
+    total_counter = TotalCounter(Music)
+    yield total_counter
+    total_counter.remove()
+
+
+def test_total_counter(fx_session, fx_total_counter):
+    for name in [u'a', u'b', u'c']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    assert fx_total_counter.total(fx_session) == 3
+    with QueryCounter(fx_session) as counter:
+        fx_session.add(Music(name=u'd'))
+        fx_session.flush()
+        # Not committed yet.
+        assert fx_total_counter.total(fx_session) == 3
+        fx_session.commit()
+        music = fx_session.query(Music).filter_by(name=u'a').one()
+        fx_session.delete(music)
+        fx_session.commit()
+        assert fx_total_counter.total(fx_session) == 3
+        assert not [s for s in counter.statements if 'count' in s.lower()]
+    fx_session.add(Music(name=u'e'))
+    fx_session.flush()
+    fx_session.rollback()
+    assert fx_total_counter.total(fx_session) == 3
+    fx_session.query(Music).filter_by(name=u'b').delete()
+    fx_session.commit()
+    assert fx_total_counter.total(fx_session) == 2
+
+
+def test_total_counter_drift(fx_session, fx_total_counter):
+    fx_session.add(Music(name=u'a'))
+    fx_session.commit()
+    assert fx_total_counter.drift(fx_session) is None
+    fx_total_counter.total(fx_session)
+    # Core statements aren't followed.
+    fx_session.execute(Music.__table__.insert(), [{'name': u'b'},
+                                                  {'name': u'c'}])
+    fx_session.commit()
+    assert fx_total_counter.drift(fx_session) == 2
+    assert fx_total_counter.total(fx_session) == 1
+    assert fx_total_counter.drift(fx_session, reconcile=True) == 2
+    assert fx_total_counter.total(fx_session) == 3
+    assert fx_total_counter.drift(fx_session) == 0
+
+
+def test_total_counter_reconcile_race(fx_session, fx_total_counter):
+    fx_session.add(Music(name=u'a'))
+    fx_session.commit()
+    assert fx_total_counter.total(fx_session) == 1
+
+    def count_before_commit(query):
+        # An insert is committed while rows are being counted.
+        fx_session.add(Music(name=u'b'))
+        fx_session.commit()
+        return 1
+    with patch('dodotable.totals.count_rows', count_before_commit):
+        assert fx_total_counter.reconcile(fx_session) == 1
+        assert fx_total_counter.total(fx_session) == 2
+        assert fx_total_counter.drift(fx_session, reconcile=True) == -1
+        assert fx_total_counter.total(fx_session) == 3
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_total_counter(environ, fx_session, fx_total_counter):
+    for name in [u'a', u'b']:
+        fx_session.add(Music(name=name))
+    fx_session.commit()
+    fx_total_counter.total(fx_session)
+
+    def make_table(request_args):
+        table = Table(cls=Music, label=u'music', columns=[
+            Column(attr='id', label=u'id'),
+        ], sqlalchemy_session=fx_session, total_counter=fx_total_counter)
+        table.add_filter(SelectFilter(Music, 'name', [
+            {'name': u'a', 'description': u'A'},
+        ], request_args, default='all'))
+        return table
+    with QueryCounter(fx_session) as counter:
+        assert make_table({}).count == 2
+    assert counter.count == 0
+    assert make_table({'select.name': u'a'}).count == 1
+
+
+@patch('dodotable.schema.Schema.environment', new_callable=PropertyMock,
+       return_value=DodotableTestEnvironment())
+def test_table_total_counter_etag(environ, fx_session):
+    created_at = datetime.datetime(2017, 3, 10)
+    fx_session.add(Event(created_at=created_at, day=created_at.date()))
+    fx_session.commit()
+    total_counter = TotalCounter(Event)
+    try:
+        table = Table(cls=Event, label=u'event', columns=[
+            Column(attr='id', label=u'id'),
+        ], sqlalchemy_session=fx_session, version_attr='created_at',
+            total_counter=total_counter)
+        assert table.count == 1
+        etag = table.etag()
+        # An older row inserted where the counter doesn't see it.
+        earlier = created_at - datetime.timedelta(days=1)
+        fx_session.execute(Event.__table__.insert(),
+                           [{'created_at': earlier, 'day': earlier.date()}])
+        fx_session.commit()
+        assert total_counter.total(fx_session) == 1
+        assert table.etag() != etag
+    finally:
+        total_counter.remove()
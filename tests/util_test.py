@@ -1,6 +1,15 @@
+import re
+
 from six import text_type
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm import Session
 
-from dodotable.util import string_literal, _get_data
+from .entities import Music, Tag
+from .helper import DodotableTestEnvironment, extract_soup
+from dodotable.counter import QueryCounter
+from dodotable.schema import Cell
+from dodotable.util import (compile_templates, count_rows, query_key,
+                            string_literal, _get_data)
 
 
 def test__get_data():
@@ -23,3 +32,103 @@ def test_string_literal():
     assert isinstance(string_literal(1.1), text_type)
     assert isinstance(string_literal('hello'), text_type)
     assert isinstance(string_literal(u'hello'), text_type)
+
+
+class CompiledTemplatesEnvironment(DodotableTestEnvironment):
+
+    def __init__(self, compiled_templates):
+        super(CompiledTemplatesEnvironment, self).__init__()
+        self.compiled_templates = compiled_templates
+
+
+def test_compile_templates(tmpdir):
+    target = str(tmpdir.join('templates.zip'))
+    compile_templates(target)
+    environment = CompiledTemplatesEnvironment(None)
+    assert not environment.get_jinja_environment().get_template(
+        'cell.html'
+    ).filename.startswith(target)
+    environment.compiled_templates = target
+    jinja_environment = environment.get_jinja_environment()
+    assert environment.get_jinja_environment() is jinja_environment
+    template = jinja_environment.get_template('cell.html')
+    # Loaded from a module, not parsed from the source.
+    assert template.filename.startswith(target)
+    cell = Cell(0, 0, u'hello')
+    cell.environment = environment
+    assert extract_soup(cell).find('td', text=re.compile('hello'))
+
+
+class GlobalsEnvironment(DodotableTestEnvironment):
+
+    greeting = u'hello'
+
+    @property
+    def name(self):
+        return self.names.pop(0)
+
+
+def test_environment_globals():
+    environment = GlobalsEnvironment()
+    environment.names = [u'a', u'b']
+    assert environment.__dict__()['name'] == u'a'
+    # Properties and attributes set later are got again.
+    environment.greeting = u'bye'
+    template_globals = environment.__dict__()
+    assert template_globals['name'] == u'b'
+    assert template_globals['greeting'] == u'bye'
+    assert '_routing_policy' in template_globals
+    assert '__env_methods__' not in template_globals
+    assert 'render' not in template_globals
+
+
+def test_count_rows(fx_session):
+    for name in [u'a', u'b', u'c']:
+        fx_session.add(Music(name=name))
+    for name in [u'a', u'a', u'b']:
+        fx_session.add(Tag(name=name, t=u'genre'))
+    fx_session.commit()
+    queries = [
+        fx_session.query(Music),
+        fx_session.query(Music).filter(Music.name != u'c')
+                  .order_by(Music.name.desc()),
+        # Joins repeat musics of the same tags.
+        fx_session.query(Music).join(Tag, Tag.name == Music.name)
+                  .order_by(Tag.id),
+        fx_session.query(Music).outerjoin(Tag, Tag.name == Music.name),
+        fx_session.query(Music.name).join(Tag, Tag.name == Music.name),
+        fx_session.query(Music).join(Tag, Tag.name == Music.name)
+                  .distinct(),
+        fx_session.query(Music).limit(2),
+    ]
+    for query in queries:
+        with QueryCounter(fx_session) as counter:
+            count = count_rows(query)
+        assert count == len(query.all())
+        assert counter.count == 1
+    with QueryCounter(fx_session) as counter:
+        count_rows(queries[2])
+    statement = counter.statements[0]
+    assert 'count(DISTINCT music.id)' in statement
+    assert 'ORDER BY' not in statement
+    assert '(SELECT' not in statement
+
+
+def test_query_key(tmpdir):
+    engines = [create_engine('sqlite:///{}'.format(tmpdir.join(name)))
+               for name in ('primary.db', 'replica.db')]
+    sessions = [Session(bind=engine) for engine in engines]
+    try:
+        keys = [query_key(session.query(Music).filter(Music.name == u'a'))
+                for session in sessions]
+        assert keys[0] == query_key(
+            sessions[0].query(Music).filter(Music.name == u'a')
+        )
+        # The same query on another database isn't the same.
+        assert keys[0] != keys[1]
+        assert keys[0][1:] == keys[1][1:]
+    finally:
+        for session in sessions:
+            session.close()
+        for engine in engines:
+            engine.dispose()